@@ -0,0 +1,171 @@
+'''
+Bitboard tables and helpers used by the board class for move generation and attack detection,
+along with the zobrist keys used to hash positions for repetition detection.
+Squares are indexed the same way as the board array: square = row * 8 + col, so bit 0 is a8 and bit 63 is h1.
+'''
+
+import random
+
+FULL = (1 << 64) - 1   # every square, used as the default 'no restriction' mask for move targets
+
+# pieces are stored as small ints, the low 3 bits are the piece type and bit 3 is the color so 0 is an empty square,
+# white pieces are 1 to 6 and black pieces 9 to 14. Two pieces are on opposite sides when (a ^ b) & BLACK is set
+WHITE, BLACK = 0, 8
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+
+ROOK_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+BISHOP_DIRECTIONS = ((1, 1), (-1, 1), (1, -1), (-1, -1))
+KNIGHT_OFFSETS = ((2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2))
+KING_OFFSETS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+def _build_leaper_table(offsets: tuple) -> tuple:
+    '''
+    Builds a table with the squares a piece with fixed jumps (knight or king) attacks from each square
+
+    Args:
+        offsets (tuple): The (row, col) jumps of the piece
+
+    Returns:
+        tuple: 64 bitboards indexed by square
+    '''
+    table = []
+    for row in range(8):
+        for col in range(8):
+            mask = 0
+            for dr, dc in offsets:
+                r, c = row + dr, col + dc
+                if 0 <= r < 8 and 0 <= c < 8:
+                    mask |= 1 << (r * 8 + c)
+            table.append(mask)
+    return tuple(table)
+
+def _build_rays(dr: int, dc: int) -> tuple:
+    '''
+    Builds the ray going in one direction from every square up to the edge of the board, the square itself is excluded
+
+    Args:
+        dr (int): row step of the direction
+        dc (int): column step of the direction
+
+    Returns:
+        tuple: 64 bitboards indexed by square
+    '''
+    rays = []
+    for row in range(8):
+        for col in range(8):
+            mask = 0
+            r, c = row + dr, col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                mask |= 1 << (r * 8 + c)
+                r, c = r + dr, c + dc
+            rays.append(mask)
+    return tuple(rays)
+
+ROW_MASKS = tuple(0xFF << (8 * row) for row in range(8))
+FILE_MASKS = tuple(sum(1 << (row * 8 + col) for row in range(8)) for col in range(8))
+
+KNIGHT_ATTACKS = _build_leaper_table(KNIGHT_OFFSETS)
+ADJACENT_SQUARES = _build_leaper_table(((0, -1), (0, 1)))   # the squares to the left and right on the same row, used for en passant
+KING_ATTACKS = _build_leaper_table(KING_OFFSETS)
+
+# squares attacked by a pawn of the given color standing on each square, white pawns move towards row 0
+PAWN_ATTACKS = {WHITE: _build_leaper_table(((-1, -1), (-1, 1))), BLACK: _build_leaper_table(((1, -1), (1, 1)))}
+
+# for every direction we also store whether it walks towards higher square indexes so that the nearest blocker
+# can be found with a single bit scan (lowest set bit for increasing rays and highest set bit for decreasing ones)
+ROOK_RAYS = tuple((dr * 8 + dc > 0, _build_rays(dr, dc)) for dr, dc in ROOK_DIRECTIONS)
+BISHOP_RAYS = tuple((dr * 8 + dc > 0, _build_rays(dr, dc)) for dr, dc in BISHOP_DIRECTIONS)
+
+def _sliding_attacks(square: int, occupancy: int, rays: tuple) -> int:
+    '''
+    Calculates the attacks of a sliding piece by cutting each ray at the first occupied square
+
+    Args:
+        square (int): The square of the sliding piece
+        occupancy (int): Bitboard of all occupied squares
+        rays (tuple): ROOK_RAYS or BISHOP_RAYS
+
+    Returns:
+        int: Bitboard of attacked squares, including the blockers themselves
+    '''
+    attacks = 0
+    for increasing, ray_table in rays:
+        ray = ray_table[square]
+        blockers = ray & occupancy
+        if blockers:
+            blocker = (blockers & -blockers).bit_length() - 1 if increasing else blockers.bit_length() - 1
+            ray ^= ray_table[blocker]   # removing everything behind the blocker
+        attacks |= ray
+    return attacks
+
+def _build_blocker_masks(rays: tuple) -> tuple:
+    '''
+    Builds the squares whose occupancy matters for a sliding piece on each square, these are its rays without
+    the last square of each ray as a piece on the edge of the board can't block anything behind it
+
+    Args:
+        rays (tuple): ROOK_RAYS or BISHOP_RAYS
+
+    Returns:
+        tuple: 64 bitboards indexed by square
+    '''
+    masks = []
+    for square in range(64):
+        mask = 0
+        for increasing, ray_table in rays:
+            ray = ray_table[square]
+            if ray:
+                last = ray.bit_length() - 1 if increasing else (ray & -ray).bit_length() - 1
+                mask |= ray ^ (1 << last)
+        masks.append(mask)
+    return tuple(masks)
+
+def _build_attack_table(masks: tuple, rays: tuple) -> tuple:
+    '''
+    Works out the attacks of a sliding piece for every arrangement of blockers on its mask, this plays the part of
+    magic bitboards with the masked occupancy used directly as a dictionary key instead of being hashed by a magic number
+
+    Args:
+        masks (tuple): The blocker masks of each square
+        rays (tuple): ROOK_RAYS or BISHOP_RAYS
+
+    Returns:
+        tuple: 64 dictionaries mapping the masked occupancy to the attacked squares
+    '''
+    table = []
+    for square in range(64):
+        mask = masks[square]
+        attacks = {}
+        distinct = {}   # many arrangements give the same attacks so the same int object is shared to save memory
+        blockers = 0
+        while True:   # walks through every subset of the mask
+            attacked = _sliding_attacks(square, blockers, rays)
+            attacks[blockers] = distinct.setdefault(attacked, attacked)
+            blockers = (blockers - mask) & mask
+            if not blockers:
+                break
+        table.append(attacks)
+    return tuple(table)
+
+ROOK_MASKS = _build_blocker_masks(ROOK_RAYS)
+BISHOP_MASKS = _build_blocker_masks(BISHOP_RAYS)
+ROOK_ATTACK_TABLE = _build_attack_table(ROOK_MASKS, ROOK_RAYS)
+BISHOP_ATTACK_TABLE = _build_attack_table(BISHOP_MASKS, BISHOP_RAYS)
+
+def rook_attacks(square: int, occupancy: int) -> int:
+    '''Returns the bitboard of squares attacked by a rook on the given square'''
+    return ROOK_ATTACK_TABLE[square][occupancy & ROOK_MASKS[square]]
+
+def bishop_attacks(square: int, occupancy: int) -> int:
+    '''Returns the bitboard of squares attacked by a bishop on the given square'''
+    return BISHOP_ATTACK_TABLE[square][occupancy & BISHOP_MASKS[square]]
+
+# random keys for zobrist hashing, a position is hashed by xoring the keys of everything in it so that a move
+# only has to xor the keys of what it changed. A fixed seed keeps the hashes the same between runs
+_zobrist_random = random.Random(2024)
+# indexed by piece then square, the ids that are not pieces have no keys
+ZOBRIST_PIECES = tuple(tuple(_zobrist_random.getrandbits(64) for _ in range(64)) if PAWN <= piece & 7 <= KING else None
+                       for piece in range(BLACK + KING + 1))
+ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
+ZOBRIST_CASTLING = (0,) + tuple(_zobrist_random.getrandbits(64) for _ in range(15))   # indexed by the 4 bits of castling rights
+ZOBRIST_EN_PASSANT = tuple(_zobrist_random.getrandbits(64) for _ in range(8))   # indexed by the file of the en passant square
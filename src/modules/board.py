@@ -4,33 +4,80 @@ It contains the board class which stores the game state and manipulation regardi
 '''
 
 import sys
-from modules.move import Move
+import re
+from modules.move import Move, FILE_MAP, RANK_MAP
+from modules.bitboard import FULL, WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, ROW_MASKS, FILE_MASKS, ADJACENT_SQUARES, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, ROOK_RAYS, BISHOP_RAYS, rook_attacks, bishop_attacks, \
+                             ZOBRIST_PIECES, ZOBRIST_BLACK_TO_MOVE, ZOBRIST_CASTLING, ZOBRIST_EN_PASSANT
 import logging
 try:
     logging.basicConfig(level=logging.INFO, filename='logs/chess_project_log.txt')  # Set logging level to INFO
 except FileNotFoundError:
     pass
 
+# mapping from fen characters to the piece symbols of the board array
+FEN_TO_PIECE = {
+    'r': 'bR', 'n': 'bN', 'b': 'bB', 'q': 'bQ', 'k': 'bK', 'p': 'bp',
+    'R': 'wR', 'N': 'wN', 'B': 'wB', 'Q': 'wQ', 'K': 'wK', 'P': 'wp'
+}
+FEN_EMPTY_SQUARES = re.compile('[1-8]')   # a digit in a fen row is a run of empty squares
+
+# the board is stored as one byte per square holding the piece id(see the piece constants in bitboard.py),
+# these map the ids to the piece symbols and back, ids 7 and 8 are not pieces
+PIECES = ('--', 'wp', 'wN', 'wB', 'wR', 'wQ', 'wK', '', '', 'bp', 'bN', 'bB', 'bR', 'bQ', 'bK')
+PIECE_IDS = {piece: piece_id for piece_id, piece in enumerate(PIECES) if piece}
+PIECE_FEN_CHARS = ' PNBRQK  pnbrqk'   # the fen character of each piece id, the empty square is never looked up
+PIECE_TYPES = {'p': PAWN, 'N': KNIGHT, 'B': BISHOP, 'R': ROOK, 'Q': QUEEN, 'K': KING}   # the type bits of each piece letter
+
+# for each color the square offsets of a push and of the captures towards the a and h files, the row a pawn
+# reaches with a single push from its starting row and the row it promotes on
+PAWN_STEPS = {WHITE: (-8, -9, -7, 5, 0), BLACK: (8, 7, 9, 2, 7)}
+PROMOTION_PIECES = ('Q', 'N', 'R', 'B')
+
+# rough piece values used for ordering the legal moves, the king is never captured
+PIECE_VALUES = {'p': 1, 'N': 3, 'B': 3, 'R': 5, 'Q': 9, 'K': 0}
+
+# castling rights are kept as 4 bits, these map each right to its bit and every combination of bits back to its fen string
+CASTLING_BITS = {'K': 1, 'Q': 2, 'k': 4, 'q': 8}
+CASTLING_SIDE_BITS = {WHITE: (1, 2), BLACK: (4, 8)}   # the kingside and queenside bits of each color
+# for the kingside then the queenside of each color, the squares between the king and the rook that have to be empty and the
+# squares the king starts on, passes and lands on that can't be attacked. The rights only last while the king is on its home square
+CASTLING_MASKS = {color: ((0b11 << (king + 1), 0b111 << king), (0b111 << (king - 3), 0b111 << (king - 2)))
+                  for color, king in ((WHITE, 60), (BLACK, 4))}
+CASTLING_STRINGS = tuple(''.join(right for right in 'KQkq' if rights & CASTLING_BITS[right]) for rights in range(16))
+# the king and rook each right needs on their home squares, rights that a fen gives without them are dropped when it is read
+CASTLING_HOME_PIECES = {'K': ((60, 'wK'), (63, 'wR')), 'Q': ((60, 'wK'), (56, 'wR')), 'k': ((4, 'bK'), (7, 'bR')), 'q': ((4, 'bK'), (0, 'bR'))}
+# the rights lost when a move starts or ends on a square, this covers moving the king or a rook and capturing a rook in its corner
+CASTLING_RIGHTS_LOST = tuple({60: 1 | 2, 63: 1, 56: 2, 4: 4 | 8, 7: 4, 0: 8}.get(square, 0) for square in range(64))
+
 # all items in this file will use coordinates as array indexes
 class Board:
     """
     Represents a chess board.
 
     Attributes:
-        board_array (list[list[str]]): A 2D list representing the current state of the chess board.
+        squares (bytearray): The piece id (see PIECES) on each square, indexed by row * 8 + col.
+        board_array (list[list[str]]): A 2D list of piece symbols built from the squares, kept for displaying the board.
+        bb (list): The bitboard of the squares each piece occupies (bit row * 8 + col), indexed by piece id.
+        white_occ (int): Bitboard of all squares occupied by white pieces.
+        black_occ (int): Bitboard of all squares occupied by black pieces.
+        occ (int): Bitboard of all occupied squares.
+        zobrist_hash (int): Zobrist hash of the pieces on the board, updated with every changed square.
         white_to_move (bool): True if it's white's turn to move, False if it's black's turn.
         castling_rights (Castling_Rights): An object representing the castling rights for both players.
         en_passant_square (tuple): The target square for en passant capture, represented as a tuple (row, column).
+        en_passant_log (list): The en passant squares before each move in the move log, used for undoing moves.
         halfmove_clock (int): The number of halfmoves since the last capture or pawn advance.
+        halfmove_clock_log (list): The halfmove clock before each move played with make_legal_move, used for undoing moves.
         fullmove_number (int): The number of the full move. It starts at 1 and is incremented after black's move.
-        moveFunctions (dict): A dictionary mapping piece type to legal move generating function.
         move_log (list): A list of moves made in the game.
-        fen_log (list): A list of FEN strings representing the board state at different positions.
+        position_log (list): A list of position keys (see position_key) of every position in the game to detect draw by repetition.
+        irreversible_plies (list): Indexes in the position log of the positions after each capture or pawn move, no earlier position can repeat.
         white_king_pos (tuple): The position of the white king on the board.
         black_king_pos (tuple): The position of the black king on the board.
         is_checkmate (bool): True if the game is in checkmate, False otherwise.
         is_draw (bool): True if the game is a draw, False otherwise.
         legal_moves (list): A list of legal moves for the current position.
+        legal_moves_by_uci (dict): The same legal moves keyed by their uci, used to find the move the user made.
 
     Methods:
         __repr__() -> str:
@@ -87,31 +134,65 @@ class Board:
         '''
         # extracting details of the position from the fen string
         result = self.fen_to_board(fen)
-        self.board_array = result[0]
+        self.squares = bytearray(PIECE_IDS[piece] for row in result[0] for piece in row)
         self.white_to_move = result[1]
         self.castling_rights = result[2]
         self.en_passant_square = result[3]
         self.halfmove_clock = result[4]
+        self.halfmove_clock_log = []
         self.fullmove_number = result[5]
 
-        # a dictionary mapping piece type to legal move generating function
-        self.moveFunctions = {'p': self.get_pawn_moves, 'R': self.get_rook_moves, 'N': self.get_knight_moves,
-                              'B': self.get_bishop_moves, 'Q': self.get_queen_moves, 'K': self.get_king_moves}
+        # bitboards are kept in sync with the board array and are used for move generation and attack detection
+        self.bb = [0] * len(PIECES)
+        self.zobrist_hash = 0
+        for square, piece_id in enumerate(self.squares):
+            if piece_id:
+                self.bb[piece_id] |= 1 << square
+                self.zobrist_hash ^= ZOBRIST_PIECES[piece_id][square]
+        self.white_occ = sum(self.bb[WHITE | piece_type] for piece_type in range(PAWN, KING + 1))
+        self.black_occ = sum(self.bb[BLACK | piece_type] for piece_type in range(PAWN, KING + 1))
+        self.occ = self.white_occ | self.black_occ
+        self.en_passant_log = []
 
         self.move_log = []   # for undo and exporting/importing games
-        self.fen_log = [self.board_to_fen()[:self.board_to_fen().rfind(' ', 0, self.board_to_fen().rfind(' '))]]   # a list of fens to detect draw by repetition
+        self.position_log = [self.position_key()]   # a list of position keys to detect draw by repetition
+        self.irreversible_plies = [0]
         self.white_king_pos, self.black_king_pos = self.get_king_locations()
         self.is_checkmate = False
         self.is_draw = False
-        self.legal_moves = self.get_legal_moves()   # the legal moves for the current position
+        self.update_legal_moves()
+
+    @property
+    def board_array(self) -> list[list[str]]:
+        '''
+        A 2D list of the piece symbols on the board for displaying it, this is built on every access
+        so use piece_at to look at single squares
+
+        Returns:
+            list[list[str]]: The piece symbol of each square, '--' for empty squares
+        '''
+        return [[PIECES[piece_id] for piece_id in self.squares[row * 8: row * 8 + 8]] for row in range(8)]
+
+    def piece_at(self, row: int, col: int) -> str:
+        '''
+        Gives the piece standing on a square
+
+        Args:
+            row (int): row of the board array
+            col (int): column of the board array
+
+        Returns:
+            str: The piece symbol such as 'wp', '--' if the square is empty
+        '''
+        return PIECES[self.squares[row * 8 + col]]
 
     class Castling_Rights:
         """
         Represents the castling rights for a chess game.
 
         Attributes:
-            castling_rights_string (str): A string representing the current castling rights.
-            castling_rights_log (list): A list of strings representing the castling rights history.
+            rights (int): The current castling rights as bits, see CASTLING_BITS.
+            castling_rights_log (list): A list of the castling rights history.
 
         Methods:
             has_rights(side: str) -> bool:
@@ -146,52 +227,39 @@ class Board:
             Returns:
             - None
             """
-            self.castling_rights_string = castling_rights_string
-            self.castling_rights_log = [castling_rights_string]
+            self.rights = sum(CASTLING_BITS.get(right, 0) for right in set(castling_rights_string))   # '-' adds nothing
+            self.castling_rights_log = [self.rights]
 
         def has_rights(self, side: str) -> bool:
             """Check if the given side has castling rights."""
-            return side in self.castling_rights_string
+            return self.rights & CASTLING_BITS[side] != 0
 
         def remove_rights(self, *sides: str) -> None:
             """Remove castling rights for the specified sides."""
             for side in sides:
-                self.castling_rights_string = self.castling_rights_string.replace(side, '')
+                self.rights &= ~CASTLING_BITS[side]
 
         def update(self, move: Move) -> None:
             """Update castling rights based on the move made."""
-            if move.piece_moved == 'wK':
-                self.remove_rights('K', 'Q')
-            elif move.piece_moved == 'bK':
-                self.remove_rights('k', 'q')
-            elif move.piece_moved == 'wR':
-                if move.start_col == 7:
-                    self.remove_rights('K')
-                elif move.start_col == 0:
-                    self.remove_rights('Q')
-            elif move.piece_moved == 'bR':
-                if move.start_col == 7:
-                    self.remove_rights('k')
-                elif move.start_col == 0:
-                    self.remove_rights('q')
-
-            self.castling_rights_log.append(self.castling_rights_string)
+            # a single lookup of both squares covers king moves, rook moves and rooks being captured
+            self.rights &= ~(CASTLING_RIGHTS_LOST[move.start_square] | CASTLING_RIGHTS_LOST[move.end_square])
+            self.castling_rights_log.append(self.rights)
 
         def undo_castling_rights(self) -> None:
             '''Will restore the castling rights for the last position'''
             if len(self.castling_rights_log) != 0:
                 self.castling_rights_log.pop()
                 if len(self.castling_rights_log) != 0:
-                    self.castling_rights_string = self.castling_rights_log[-1]
+                    self.rights = self.castling_rights_log[-1]
 
         def __str__(self) -> str:
-            return self.castling_rights_string if self.castling_rights_string else "-"
+            return CASTLING_STRINGS[self.rights] or "-"
 
         def __eq__(self, other) -> bool:
-            return self.castling_rights_string == other.castling_rights_string
+            return self.rights == other.rights
 
         def __repr__(self) -> str:
-            return self.castling_rights_string
+            return CASTLING_STRINGS[self.rights]
 
     def log_board_state(self, *args: str) -> None:
         """
@@ -222,9 +290,9 @@ class Board:
             else:
                 for attr_name in vars(self):
                     attr_value = getattr(self, attr_name)
-                    if attr_name == 'board_array':  # Handle board_array separately
-                        state_str += f'{attr_name}:\n'
-                        for row in attr_value:
+                    if attr_name == 'squares':  # Handle the board separately
+                        state_str += 'board_array:\n'
+                        for row in self.board_array:
                             state_str += ' '.join(row) + '\n'
                     else:
                         state_str += f'{attr_name}: {attr_value}\n'
@@ -256,26 +324,17 @@ class Board:
         piece_placement = sections[0]
         rows = piece_placement.split('/')
 
-        # Map FEN characters to piece symbols
-        fen_symbols = {
-            'r': 'bR', 'n': 'bN', 'b': 'bB', 'q': 'bQ', 'k': 'bK', 'p': 'bp',
-            'R': 'wR', 'N': 'wN', 'B': 'wB', 'Q': 'wQ', 'K': 'wK', 'P': 'wp'
-        }
-
-        # Create the board by converting FEN characters to piece symbols
-        board = []
-        for row in rows:
-            board_row = []
-            for char in row:
-                if char.isdigit():  # Handle empty squares
-                    board_row.extend(['--'] * int(char))
-                else:
-                    board_row.append(fen_symbols.get(char, '--'))
-            board.append(board_row)
+        # Create the board by converting FEN characters to piece symbols, the digits are first expanded into
+        # that many '1's so that every character stands for one square and '1' maps to an empty square
+        board = [[FEN_TO_PIECE.get(char, '--') for char in FEN_EMPTY_SQUARES.sub(lambda digit: '1' * int(digit.group()), row)]
+                 for row in rows]
 
         # Extract other details from the FEN string
         active_color = sections[1] == 'w'
-        castling_rights = self.Castling_Rights(sections[2])
+        # a pasted fen can give rights that its pieces don't allow, castling would then move a rook that isn't there. Once the
+        # rights match the pieces they stay that way as moving or capturing the king or a rook removes them
+        castling_rights = self.Castling_Rights(''.join(right for right in sections[2] if right in CASTLING_HOME_PIECES and
+                                                       all(board[square // 8][square % 8] == piece for square, piece in CASTLING_HOME_PIECES[right])))
         en_passant_target = None if sections[3] == '-' else ((8 - int(sections[3][1])), ord(sections[3][0]) - ord('a'))
         halfmove_clock = int(sections[4])
         fullmove_number = int(sections[5])
@@ -289,29 +348,22 @@ class Board:
         Returns:
             str: The FEN notation representing the current board state.
         """
-        # Dictionary to map piece symbols to FEN characters
-        piece_to_fen = {
-            'bR': 'r', 'bN': 'n', 'bB': 'b', 'bQ': 'q', 'bK': 'k', 'bp': 'p',
-            'wR': 'R', 'wN': 'N', 'wB': 'B', 'wQ': 'Q', 'wK': 'K', 'wp': 'P',
-            '--': ''
-        }
-
         # Convert the board state to FEN notation
         fen_pieces = []
-        for row in self.board_array:
-            fen_row = ''
+        for row_start in range(0, 64, 8):
+            fen_row = []
             empty_count = 0
-            for square in row:
-                if square == '--':
+            for piece_id in self.squares[row_start: row_start + 8]:
+                if not piece_id:
                     empty_count += 1
                 else:
                     if empty_count > 0:
-                        fen_row += str(empty_count)
+                        fen_row.append(str(empty_count))
                         empty_count = 0
-                    fen_row += piece_to_fen[square]
+                    fen_row.append(PIECE_FEN_CHARS[piece_id])
             if empty_count > 0:
-                fen_row += str(empty_count)
-            fen_pieces.append(fen_row)
+                fen_row.append(str(empty_count))
+            fen_pieces.append(''.join(fen_row))
 
         # Join rows with slashes to form the piece placement section
         piece_placement = '/'.join(fen_pieces)
@@ -321,58 +373,103 @@ class Board:
         castling_rights = str(self.castling_rights)
         # Determine the en passant target square
         if self.en_passant_square is not None:
-            en_passant_target = Move.file_map[self.en_passant_square[1]] + Move.rank_map[self.en_passant_square[0]]
+            en_passant_target = FILE_MAP[self.en_passant_square[1]] + RANK_MAP[self.en_passant_square[0]]
         else:
             en_passant_target = '-'
             
         # Combine all parts into FEN notation
-        fen = ' '.join([piece_placement, active_color, castling_rights, en_passant_target, str(self.halfmove_clock // 1), str(self.fullmove_number)])
+        fen = ' '.join([piece_placement, active_color, castling_rights, en_passant_target, str(self.halfmove_clock), str(self.fullmove_number)])
 
         return fen
 
+    def position_key(self) -> int:
+        '''
+        Gives the key used to detect repetitions, it is the zobrist hash of the pieces combined with the side to move,
+        castling rights and en passant square so it covers the same details as the first four fields of the fen
+
+        Returns:
+            int: A 64 bit hash of the position
+        '''
+        key = self.zobrist_hash
+        if not self.white_to_move:
+            key ^= ZOBRIST_BLACK_TO_MOVE
+        key ^= ZOBRIST_CASTLING[self.castling_rights.rights]
+        if self.en_passant_square is not None:
+            key ^= ZOBRIST_EN_PASSANT[self.en_passant_square[1]]
+        return key
+
     ##########     make/undo moves     ##########
 
+    def _set_square(self, row: int, col: int, piece: int) -> None:
+        '''
+        Puts a piece (or 0 to empty it) on a square and keeps the bitboards and zobrist hash in sync with the squares
+
+        Args:
+            row (int): row of the board array
+            col (int): column of the board array
+            piece (int): The id of the piece to put on the square
+        '''
+        square = row * 8 + col
+        bit = 1 << square
+        old_piece = self.squares[square]
+        if old_piece:
+            self.bb[old_piece] ^= bit
+            self.zobrist_hash ^= ZOBRIST_PIECES[old_piece][square]
+            if old_piece & BLACK:
+                self.black_occ ^= bit
+            else:
+                self.white_occ ^= bit
+        if piece:
+            self.bb[piece] |= bit
+            self.zobrist_hash ^= ZOBRIST_PIECES[piece][square]
+            if piece & BLACK:
+                self.black_occ |= bit
+            else:
+                self.white_occ |= bit
+        self.occ = self.white_occ | self.black_occ
+        self.squares[square] = piece
+
     def _make_psuedo_legal_move(self, move: Move) -> None:
         '''
         This function is is used to update the state of the board. It only makes any move legal or not
         and has the primary purpose of move validation
 
-        Warning: Do not use this to make move as it will result in errors
+        Warning: Do not use this to make move as it will result in errors, the move is not checked here
+        so it has to come from the move generators
 
         Args:
             move (move object): The move object will update the board
-            is_legal (Bool): An optional parameter to ask if we are making a legal move or psuedo legal
         '''
-        try:
-            self.move_log.append(move)
-            self.white_to_move = not self.white_to_move
-
-            # updating the move counters
-            self.fullmove_number += 1 if self.white_to_move else 0
-
-            # remove en passanted pawn
-            if move.piece_moved[1] == 'p' and move.start_col != move.end_col and move.piece_captured == '--':
-                self.board_array[move.end_row + (1 if move.piece_moved[0] == 'w' else -1)][move.end_col] = '--'
-
-            # updating the board
-            self.board_array[move.start_row][move.start_col] = '--'
-            self.board_array[move.end_row][move.end_col] = move.piece_moved
-            self.white_king_pos, self.black_king_pos = self.get_king_locations()   # updating the king positions
-
-            # if promotion happens change the piece type
-            if move.promoted_piece is not None:
-                self.board_array[move.end_row][move.end_col] = move.piece_moved[0] + move.promoted_piece
-            self.castling_rights.update(move)
-
-            if move.is_castling:   #  moving rook if we castle
-                if move.end_col > move.start_col:   # kingside castling
-                    self.board_array[move.end_row][move.end_col-1] = self.board_array[move.end_row][move.end_col+1]   # moving the rook
-                    self.board_array[move.end_row][move.end_col+1] = '--'
-                elif move.end_col < move.start_col:   # queenside castling
-                    self.board_array[move.end_row][move.end_col+1] = self.board_array[move.end_row][move.end_col-2]   # moving the rook
-                    self.board_array[move.end_row][move.end_col-2] = '--'
-        except Exception as e:
-            print(f'The function make _psuedo_legal_move is not for use outside of the class ,{e}')
+        self.move_log.append(move)
+        self.en_passant_log.append(self.en_passant_square)
+        self.white_to_move = not self.white_to_move
+
+        # updating the move counters
+        self.fullmove_number += 1 if self.white_to_move else 0
+
+        piece = self.squares[move.start_square]
+        # remove en passanted pawn
+        if piece & 7 == PAWN and move.start_col != move.end_col and self.squares[move.end_square] == 0:
+            self._set_square(move.end_row + (-1 if piece & BLACK else 1), move.end_col, 0)
+
+        # updating the board, if promotion happens change the piece type
+        self._set_square(move.start_row, move.start_col, 0)
+        self._set_square(move.end_row, move.end_col, piece if move.promoted_piece is None else (piece & BLACK) | PIECE_TYPES[move.promoted_piece])
+        if piece & 7 == KING:   # updating the king positions, castling is covered too as the king moves to its end square
+            if piece & BLACK:
+                self.black_king_pos = (move.end_row, move.end_col)
+            else:
+                self.white_king_pos = (move.end_row, move.end_col)
+        self.castling_rights.update(move)
+
+        if move.is_castling:   #  moving rook if we castle
+            rook_row = move.end_row * 8
+            if move.end_col > move.start_col:   # kingside castling
+                self._set_square(move.end_row, move.end_col-1, self.squares[rook_row + move.end_col+1])   # moving the rook
+                self._set_square(move.end_row, move.end_col+1, 0)
+            elif move.end_col < move.start_col:   # queenside castling
+                self._set_square(move.end_row, move.end_col+1, self.squares[rook_row + move.end_col-2])   # moving the rook
+                self._set_square(move.end_row, move.end_col-2, 0)
 
     def make_legal_move(self, move: Move) -> None:
         '''
@@ -388,41 +485,34 @@ class Board:
             Args:
                 move (Move): the current legal move that is played
             '''
-            if (move.piece_moved[1] == 'p' and abs(move.start_row - move.end_row) == 2 and   # if an en passant square was made
-                any(0 <= move.end_row < len(self.board_array) and 0 <= col < len(self.board_array[0]) and
-                self.board_array[move.end_row][col][0] != move.piece_moved[0] and
-                self.board_array[move.end_row][col][1] == 'p'
-                for col in (move.end_col + 1, move.end_col - 1))):
-                self.en_passant_square = (move.end_row + ( 1 if move.piece_moved[0] == 'w' else -1), move.start_col)
+            pawn = self.squares[move.end_square]
+            if (pawn & 7 == PAWN and abs(move.start_row - move.end_row) == 2 and   # if an en passant square was made
+                self.bb[pawn ^ BLACK] & ADJACENT_SQUARES[move.end_square]):   # by an enemy pawn beside it
+                self.en_passant_square = (move.end_row + (-1 if pawn & BLACK else 1), move.start_col)
             else:
                 self.en_passant_square = None
 
-        def remove_extra_details(fen):
-            """
-            Removes extra details from the given FEN (Forsyth-Edwards Notation) string.
-
-            Args:
-                fen (str): The FEN string to remove extra details from.
-
-            Returns:
-                str: The modified FEN string with extra details removed, except for castling details.
-            """
-            parts = fen.split()
-            if len(parts) >= 6:
-                parts = parts[:4]  # Keep the first four elements (up to castling details)
-            return ' '.join(parts)
-        
-        if move in self.legal_moves and not self.is_checkmate and self.is_draw == False:
-            move = self.legal_moves[self.legal_moves.index(move)]
+        legal_move = self.find_legal_move(move)
+        if legal_move is not None and not self.is_checkmate and self.is_draw == False:
+            move = legal_move
             self._make_psuedo_legal_move(move)
-            self.fen_log.append(remove_extra_details(self.board_to_fen()))
+            # the check flag is only needed for the san of moves that are actually played so it is filled in here
+            # instead of making every legal move while generating them
+            move.is_check = self.in_check()
+            move.san = move.get_san()
             # this function is here instead of the _make_psuedo_legal_moves function because we only change the en passant move when
             # we actually make a move not when validating moves as it makes all possible moves so the en passant move
             # will always be the last checked 2 square pawn move
             update_en_passant_square(move)
-            self.halfmove_clock = (self.halfmove_clock + 0.5) if move.piece_moved[1] != 'p' and move.piece_captured == '--' and (move.piece_moved == 'p' and move.start_col == move.end_col) else 0
+            self.position_log.append(self.position_key())   # after the en passant square is updated as it is part of the key
+            self.halfmove_clock_log.append(self.halfmove_clock)
+            if move.piece_moved[1] == 'p' or move.piece_captured != '--':   # captures and pawn moves can't be taken back
+                self.irreversible_plies.append(len(self.position_log) - 1)
+                self.halfmove_clock = 0
+            else:
+                self.halfmove_clock += 1
 
-            self.legal_moves = self.get_legal_moves()
+            self.update_legal_moves()
             
             if not self.legal_moves:   # checking for the end of the game
                 if self.in_check():
@@ -430,9 +520,30 @@ class Board:
                     self.move_log[-1].san = self.move_log[-1].san[: -1] + '#'   # easier way than changing the move class as it is a single case
                 else:
                     self.is_draw = True
-            elif self.halfmove_clock == 50 or any(self.fen_log.count(x) >= 3 for x in set(self.fen_log)):
+            elif self.halfmove_clock >= 100 or self.is_repetition():   # fifty moves by each player
                 self.is_draw = True
 
+    def find_legal_move(self, move: Move) -> Move:
+        '''
+        Finds the move in the legal moves list that matches a move made from the user's clicks, the legal move
+        is the one to play as it carries the details found during generation such as the castling flag
+
+        Args:
+            move (Move): The move to look for
+
+        Returns:
+            Move: The matching legal move, None if the move is illegal
+        '''
+        return self.legal_moves_by_uci.get(move.uci)
+
+    def update_legal_moves(self) -> None:
+        '''
+        Generates the legal moves for the current position, they are kept in order for iterating and by their uci
+        so a move made from the user's clicks is found with one lookup instead of comparing it to every legal move
+        '''
+        self.legal_moves = self.get_legal_moves()
+        self.legal_moves_by_uci = {move.uci: move for move in self.legal_moves}
+
     def undo_move(self, in_engine=False) -> None:
         '''
         Will return the game state on the previous move and will loose the details of the current one
@@ -443,47 +554,69 @@ class Board:
         if len(self.move_log) != 0:
             move = self.move_log.pop()
             self.fullmove_number -= 1 if self.white_to_move else 0
-            self.halfmove_clock -= 0.5 if self.halfmove_clock != 0 and not in_engine else 0
-            self.board_array[move.start_row][move.start_col] = move.piece_moved
-            self.board_array[move.end_row][move.end_col] = move.piece_captured
+            piece, captured = PIECE_IDS[move.piece_moved], PIECE_IDS[move.piece_captured]
+            self._set_square(move.start_row, move.start_col, piece)
+            self._set_square(move.end_row, move.end_col, captured)
             self.white_to_move = not self.white_to_move
             self.is_checkmate = False
             self.is_draw = False
-            self.white_king_pos, self.black_king_pos = self.get_king_locations()
+            if piece & 7 == KING:
+                if piece & BLACK:
+                    self.black_king_pos = (move.start_row, move.start_col)
+                else:
+                    self.white_king_pos = (move.start_row, move.start_col)
             self.castling_rights.undo_castling_rights()
-            if move.piece_moved[1] == 'p' and abs(move.start_row - move.end_row) == 2:
-                self.en_passant_square = (move.end_row, move.end_col)
-                if move.start_col != move.end_col and move.piece_captured == '--':   # restore en passanted pawn
-                    self.board_array[move.end_row + (1 if move.piece_moved[0] == 'w' else -1)][move.end_col] = ('w' if move.piece_moved[0] == 'b' else 'b') + 'p'
-            else:
-                self.en_passant_square = None
+            self.en_passant_square = self.en_passant_log.pop()
+            if piece & 7 == PAWN and move.start_col != move.end_col and captured == 0:   # restore en passanted pawn
+                self._set_square(move.end_row + (-1 if piece & BLACK else 1), move.end_col, piece ^ BLACK)
             if move.is_castling:
+                rook_row = move.end_row * 8
                 if move.end_col > move.start_col:   # kingside castling
-                    self.board_array[move.end_row][move.end_col+1] = self.board_array[move.end_row][move.end_col-1]   # moving the rook
-                    self.board_array[move.end_row][move.end_col-1] = '--'
+                    self._set_square(move.end_row, move.end_col+1, self.squares[rook_row + move.end_col-1])   # moving the rook
+                    self._set_square(move.end_row, move.end_col-1, 0)
                 elif move.end_col < move.start_col:   # queenside castling
-                    self.board_array[move.end_row][move.end_col-2] = self.board_array[move.end_row][move.end_col+1]   # moving the rook
-                    self.board_array[move.end_row][move.end_col+1] = '--'
+                    self._set_square(move.end_row, move.end_col-2, self.squares[rook_row + move.end_col+1])   # moving the rook
+                    self._set_square(move.end_row, move.end_col+1, 0)
             if not in_engine:
-                self.fen_log.pop()
-                self.legal_moves = self.get_legal_moves()
+                self.halfmove_clock = self.halfmove_clock_log.pop()
+                if self.irreversible_plies[-1] == len(self.position_log) - 1:
+                    self.irreversible_plies.pop()
+                self.position_log.pop()
+                self.update_legal_moves()
+
+    def is_repetition(self, count: int = 3) -> bool:
+        '''
+        Checks if the current position has occured the given number of times. Only positions with the same side to move can match
+        so every second position is compared, going backwards from the most recent one and stopping at the last capture or pawn move
+
+        Args:
+            count (int, optional): The number of occurences to look for. Defaults to 3 for threefold repetition.
+
+        Returns:
+            bool: True if the position has occured at least count times
+        '''
+        key = self.position_log[-1]
+        occurences = 1
+        for i in range(len(self.position_log) - 5, self.irreversible_plies[-1] - 1, -2):
+            if self.position_log[i] == key:
+                occurences += 1
+                if occurences >= count:
+                    return True
+        return False
 
     ##########     move validation by considering checks     ##########
 
     def get_king_locations(self) -> tuple[tuple, tuple]:
         """
-        A function to help with the board class
+        Finds both kings by scanning the board, only used when setting up a position as moves update the king positions directly
 
         Returns:
             tuple: 2 tuples representing index coordinates of white then black king
         """
-        king_positions = {'wK': None, 'bK': None}
-        for row_idx, row in enumerate(self.board_array):
-            for col_idx, piece in enumerate(row):
-                if piece in king_positions:
-                    king_positions[piece] = (row_idx, col_idx)
-                    if all(king_positions.values()):
-                        return king_positions['wK'], king_positions['bK']
+        white_king, black_king = self.bb[WHITE | KING], self.bb[BLACK | KING]
+        if white_king and black_king:
+            white_square, black_square = white_king.bit_length() - 1, black_king.bit_length() - 1
+            return (white_square >> 3, white_square & 7), (black_square >> 3, black_square & 7)
         print('ERROR: Both kings were not found on the board. Please use a valid FEN.')
         sys.exit()
 
@@ -499,198 +632,362 @@ class Board:
         else:
             return self.square_under_attack(self.black_king_pos[0], self.black_king_pos[1])
 
-    def square_under_attack(self, row: int, col: int) -> bool:
+    def square_under_attack(self, row: int, col: int, occupancy: int = None) -> bool:
         '''
-        Checks if a square is under attack from an opponent piece by calculating all opponent moves
+        Checks if a square is under attack from an opponent piece of the side to move. It stops at the first attack
+        found, the cheap table lookups for the jumping pieces are tried before the sliding rays
 
         Args:
             row (int): row of the board array
             col (int): column of the board array
+            occupancy (int, optional): The occupied squares to use for sliding pieces, defaults to the current board.
+                                       The king moves pass the board without the king so it cannot hide behind itself
 
         Returns:
             Bool: True if yes otherwise False
         '''
-        self.white_to_move = not self.white_to_move   # switch turn to get opponent moves
-        opponent_moves = self.get_psuedo_legal_moves()
-        self.white_to_move = not self.white_to_move   # restore turn
+        square = row * 8 + col
+        bb = self.bb
+        own, enemy = (WHITE, BLACK) if self.white_to_move else (BLACK, WHITE)
+        # an enemy pawn attacks this square if it stands where our pawn on this square would attack
+        if KNIGHT_ATTACKS[square] & bb[enemy | KNIGHT] or PAWN_ATTACKS[own][square] & bb[enemy | PAWN] or KING_ATTACKS[square] & bb[enemy | KING]:
+            return True
+        occ = self.occ if occupancy is None else occupancy
+        # the rays are only walked when there is a slider of that kind left
+        straight_sliders = bb[enemy | ROOK] | bb[enemy | QUEEN]
+        if straight_sliders and rook_attacks(square, occ) & straight_sliders:
+            return True
+        diagonal_sliders = bb[enemy | BISHOP] | bb[enemy | QUEEN]
+        return diagonal_sliders != 0 and bishop_attacks(square, occ) & diagonal_sliders != 0
+
+    def attacked_squares(self, by_color: int, occupancy: int = None) -> int:
+        '''
+        Builds the bitboard of every square attacked by the pieces of a color, this lets many squares be tested
+        with a bit test each instead of a separate square_under_attack call per square
 
-        for move in opponent_moves:
-            if move.end_row == row and move.end_col == col:
-                return True
-        return False
+        Args:
+            by_color (int): WHITE or BLACK, the color of the attacking pieces
+            occupancy (int, optional): The occupied squares to use for sliding pieces, defaults to the current board
+
+        Returns:
+            int: Bitboard of the attacked squares
+        '''
+        bb = self.bb
+        occ = self.occ if occupancy is None else occupancy
+        # the pawns are shifted all together, the ones on the edge files are left out of the captures towards that edge
+        pawns = bb[by_color | PAWN]
+        if by_color == WHITE:
+            attacks = ((pawns & ~FILE_MASKS[0]) >> 9) | ((pawns & ~FILE_MASKS[7]) >> 7)
+        else:
+            attacks = (((pawns & ~FILE_MASKS[0]) << 7) | ((pawns & ~FILE_MASKS[7]) << 9)) & FULL
+        attacks |= KING_ATTACKS[bb[by_color | KING].bit_length() - 1]
+        knights = bb[by_color | KNIGHT]
+        while knights:
+            attacks |= KNIGHT_ATTACKS[(knights & -knights).bit_length() - 1]
+            knights &= knights - 1
+        for sliders, slider_attacks in ((bb[by_color | ROOK] | bb[by_color | QUEEN], rook_attacks), (bb[by_color | BISHOP] | bb[by_color | QUEEN], bishop_attacks)):
+            while sliders:
+                attacks |= slider_attacks((sliders & -sliders).bit_length() - 1, occ)
+                sliders &= sliders - 1
+        return attacks
+
+    def gives_check(self, move: Move) -> bool:
+        '''
+        Checks if a legal move puts the opponent in check by making it and looking for attackers of the opponent king
 
-    def get_psuedo_legal_moves(self) -> list[Move]:
+        Args:
+            move (Move): A move from the legal moves list(so that castling moves carry their flag)
+
+        Returns:
+            bool: True if the move gives check
+        '''
+        self._make_psuedo_legal_move(move)
+        is_check = self.in_check()
+        self.undo_move(True)
+        return is_check
+
+    def _compute_pins_and_checkers(self, king_square: int) -> tuple[int, int, dict]:
         '''
-        Generates a list of psuedo-legal moves which are moves that are legal without considering checks
+        Looks outwards from the king of the side to move once to find every piece giving check and every piece pinned to the king
+
+        Args:
+            king_square (int): square index (row * 8 + col) of the king of the side to move
 
         Returns:
-            list: a list containing move objects
+            tuple[int, int, dict]: A tuple containing the following:
+                - checkers (int): Bitboard of the opponent pieces giving check
+                - block_mask (int): Bitboard of the squares that stop the check(capturing the checker or blocking its ray),
+                                    empty when there is no check
+                - pins (dict): Maps the square of each pinned piece to the bitboard of the ray it may still move along
+        '''
+        bb = self.bb
+        if self.white_to_move:
+            own_occ, enemy = self.white_occ, BLACK
+        else:
+            own_occ, enemy = self.black_occ, WHITE
+
+        # knights and pawns can't be blocked so the only way to stop their check is to capture them
+        checkers = (KNIGHT_ATTACKS[king_square] & bb[enemy | KNIGHT]) | (PAWN_ATTACKS[enemy ^ BLACK][king_square] & bb[enemy | PAWN])
+        block_mask = checkers
+        pins = {}
+
+        for rays, sliders in ((ROOK_RAYS, bb[enemy | ROOK] | bb[enemy | QUEEN]), (BISHOP_RAYS, bb[enemy | BISHOP] | bb[enemy | QUEEN])):
+            for increasing, ray_table in rays:
+                ray = ray_table[king_square]
+                blockers = ray & self.occ
+                if not blockers:
+                    continue
+                first = (blockers & -blockers).bit_length() - 1 if increasing else blockers.bit_length() - 1
+                if sliders >> first & 1:   # a slider is directly looking at the king
+                    checkers |= 1 << first
+                    block_mask |= ray ^ ray_table[first]
+                elif own_occ >> first & 1:   # our piece is pinned if the next piece behind it is an enemy slider on this ray
+                    behind = ray_table[first] & self.occ
+                    if behind:
+                        second = (behind & -behind).bit_length() - 1 if increasing else behind.bit_length() - 1
+                        if sliders >> second & 1:
+                            pins[first] = ray ^ ray_table[second]
+
+        return checkers, block_mask, pins
+
+    def _en_passant_is_legal(self, move: tuple) -> bool:
+        '''
+        En passant removes two pawns from the same row which can uncover a check that the pins can't see,
+        so it is verified by trying the capture on the bitboards and looking at the king
+
+        Args:
+            move (tuple): An en passant capture of the side to move as a move tuple
+
+        Returns:
+            bool: True if the king is safe after the capture
+        '''
+        start_row, start_col, end_row, end_col = move[:4]
+        pawn = self.squares[start_row * 8 + start_col]
+        captured_pawn = self.squares[start_row * 8 + end_col]
+        self._set_square(start_row, start_col, 0)
+        self._set_square(start_row, end_col, 0)
+        self._set_square(end_row, end_col, pawn)
+        king_pos = self.white_king_pos if self.white_to_move else self.black_king_pos
+        is_legal = not self.square_under_attack(king_pos[0], king_pos[1])
+        self._set_square(end_row, end_col, 0)
+        self._set_square(start_row, end_col, captured_pawn)
+        self._set_square(start_row, start_col, pawn)
+        return is_legal
+
+    def get_psuedo_legal_moves(self, block_mask: int = FULL, pins: dict = None, king_mask: int = FULL) -> list[tuple]:
+        '''
+        Generates a list of psuedo-legal moves which are moves that are legal without considering checks.
+        The optional masks restrict the destinations so that get_legal_moves can use this to generate legal moves directly
+
+        Args:
+            block_mask (int, optional): Bitboard of the allowed destinations for all pieces except the king
+            pins (dict, optional): Maps pinned squares to the bitboard of the ray the pinned piece may move along
+            king_mask (int, optional): Bitboard of the allowed destinations for the king
+
+        Returns:
+            list[tuple]: a list of (start_row, start_col, end_row, end_col, promoted_piece) tuples, the move objects are only
+                         made for the moves that end up in the legal moves list
         '''
         moves = []
-        for row in range(8):
-            for col in range(8):
-                piece = self.board_array[row][col]
-                if piece != '--':
-                    color = piece[0]
-                    piece_type = piece[1]
-                    if (color == 'w' and self.white_to_move) or (color == 'b' and not self.white_to_move):
-                        self.moveFunctions[piece_type](row ,col, moves)  # calls appropriate move function based on piece type
+        color = WHITE if self.white_to_move else BLACK
+        # walking the bitboards of our own pieces visits only the occupied squares instead of scanning all 64
+        # the pawns that are not pinned are all moved together, the pinned ones each have their own pin ray
+        pawns = self.bb[color | PAWN]
+        if pins:
+            for square in pins:
+                if pawns >> square & 1:
+                    pawns ^= 1 << square
+                    self.get_pawn_moves(1 << square, moves, block_mask & pins[square])
+        self.get_pawn_moves(pawns, moves, block_mask)
+
+        for pieces, move_function in ((self.bb[color | KNIGHT], self.get_knight_moves), (self.bb[color | BISHOP], self.get_bishop_moves),
+                                      (self.bb[color | ROOK], self.get_rook_moves), (self.bb[color | QUEEN], self.get_queen_moves)):
+            while pieces:
+                square = (pieces & -pieces).bit_length() - 1
+                pieces &= pieces - 1
+                if pins and square in pins:
+                    move_function(square >> 3, square & 7, moves, block_mask & pins[square])
+                else:
+                    move_function(square >> 3, square & 7, moves, block_mask)
+
+        # there is always exactly one king which is never pinned
+        king_square = self.bb[color | KING].bit_length() - 1
+        self.get_king_moves(king_square >> 3, king_square & 7, moves, king_mask)
         return moves
 
     def get_legal_moves(self) -> list[Move]:
         '''
-        Filters out the moves list into those moves only which dont leave the player's king hanging in check
+        Generates the moves which dont leave the player's king hanging in check. Instead of trying every move, the checks and
+        pins are found once and the destinations of each piece are restricted to the squares it can legally reach
 
         Returns:
             list[Move]: a list of move objects only which are legal moves
         '''
-        def update_is_check(moves: list) -> list[Move]:
-            '''
-            This function fills in the is_check parameter of the move class for the san  function`
-
-            Args:
-                moves (list[Moves]): The list of legal moves
-
-            Returns:
-                list[Moves]: The move elements updated
-            '''
-            for move in moves:
-                self._make_psuedo_legal_move(move)
-                move.is_check = self.in_check()
-                move.san = move.get_san()
-                self.undo_move(True)
-            return moves
-
-        moves = self.get_psuedo_legal_moves()
-        # this is done separately to prevent infinite recursion, see the function for more details
         active_king_pos = self.white_king_pos if self.white_to_move else self.black_king_pos
-        moves = self.get_castling_moves(active_king_pos[0], active_king_pos[1], moves)
+        king_square = active_king_pos[0] * 8 + active_king_pos[1]
+        checkers, block_mask, pins = self._compute_pins_and_checkers(king_square)
+        if not checkers:
+            block_mask = FULL
+        elif checkers & (checkers - 1):
+            block_mask = 0   # in double check only the king can move
+
+        # the king may only step on squares that are not attacked, it is removed from the occupancy so that
+        # it can't stay on the line of a slider checking it by stepping backwards. The attacks are found once
+        # for all king moves and castling instead of testing each square on its own
+        attacked = self.attacked_squares(BLACK if self.white_to_move else WHITE, self.occ ^ (1 << king_square))
+        king_mask = ~attacked & FULL
+
+        moves = self.get_psuedo_legal_moves(block_mask, pins, king_mask)
+        if self.en_passant_square is not None:
+            moves = [move for move in moves if not ((move[2], move[3]) == self.en_passant_square and self.squares[move[0] * 8 + move[1]] & 7 == PAWN)
+                     or self._en_passant_is_legal(move)]
+        moves = [Move(self, move[:4], promoted_piece=move[4]) for move in moves]
+        if not checkers:
+            # this is done separately to prevent infinite recursion, see the function for more details
+            moves = self.get_castling_moves(active_king_pos[0], active_king_pos[1], moves, attacked)
+        # the best looking moves come first so that a search on top of this list can cut off more branches,
+        # sort is stable so the quiet moves stay in the order they were generated
+        moves.sort(key=self.move_order_score, reverse=True)
+        return moves
 
-        for i in range(len(moves) - 1, -1, -1):
-            self._make_psuedo_legal_move(moves[i])  # Make the move
-            self.white_to_move = not self.white_to_move  # Switch turns
-            if self.in_check():  # If in check after making the move
-                moves.pop(i)  # Remove the move from the list
-            self.white_to_move = not self.white_to_move
-            self.undo_move(True)  # Undo the move
+    def move_order_score(self, move: Move) -> int:
+        '''
+        Gives a cheap guess of how good a move is for ordering the legal moves, captures of valuable pieces by cheap pieces
+        come first(most valuable victim, least valuable attacker) and promotions are scored by the piece promoted to
 
-        moves = update_is_check(moves)
-        return moves
+        Args:
+            move (Move): A legal move of the side to move
+
+        Returns:
+            int: The score of the move, 0 for quiet moves
+        '''
+        score = 0
+        if move.piece_captured != '--':
+            score = 10 * PIECE_VALUES[move.piece_captured[1]] - PIECE_VALUES[move.piece_moved[1]]
+        elif move.piece_moved[1] == 'p' and move.start_col != move.end_col:   # en passant
+            score = 10 * PIECE_VALUES['p'] - PIECE_VALUES['p']
+        if move.promoted_piece is not None:
+            score += 10 * PIECE_VALUES[move.promoted_piece]
+        return score
 
     ##########     piece move validation     ##########
 
-    def get_pawn_moves(self, row: int, col: int, moves: list) -> list[Move]:
+    def get_pawn_moves(self, pawns: int, moves: list, allowed: int = FULL) -> list[tuple]:
         '''
-        Creates a list of move objects that are associated with pawns which means:
+        Creates a list of moves that are associated with pawns which means:
             1. One square advance
             2. Two square advance from starting rank
             3. One square diagonal capture
             4. Promotion on last rank
             4. En-Passant captures
 
+        Unlike the other pieces this works on a whole set of pawns at once, their bitboard is shifted by the
+        push and capture offsets so every pawn is handled together and only the targets are looped over
+
         Args:
-            row (int): row index of board array
-            col (int): column index of board array
-            moves (list[Move]): a list of existing moves
+            pawns (int): Bitboard of the pawns to move, all of the same color
+            moves (list[tuple]): a list of existing moves as (start_row, start_col, end_row, end_col, promoted_piece) tuples
+            allowed (int, optional): Bitboard of the destinations the pawns are allowed to move to
 
         Returns:
-            list[Move]: A list of move objects with pawn moves combined
-        '''
-        color = self.board_array[row][col][0]  # Get the color of the pawn
-        direction = -1 if color == 'w' else 1  # Set direction based on color
-
-        # Check one or two squares ahead from the starting position
-        if 1 <= row + direction < 8:
-            # moving one square forward
-            if self.board_array[row + direction][col] == '--':
-                if (color == 'w' and row-1 == 0) or (color == 'b' and row+1 == 7):   # if we have a promotion case
-                    for piece in ['Q', 'N', 'R', 'B']:
-                        moves.append(Move(self, (row, col, row + direction, col), promoted_piece=piece))
+            list[tuple]: A list of move tuples with pawn moves combined
+        '''
+        if not pawns:
+            return moves
+        if self.white_occ & pawns:   # Get the color of the pawns
+            color, enemy_color, enemy_occ = WHITE, BLACK, self.black_occ
+        else:
+            color, enemy_color, enemy_occ = BLACK, WHITE, self.white_occ
+        push, capture_a_side, capture_h_side, double_push_row, promotion_row = PAWN_STEPS[color]
+
+        def shift(bitboard: int, offset: int) -> int:
+            return (bitboard << offset) & FULL if offset > 0 else bitboard >> -offset
+
+        empty = ~self.occ & FULL
+        single_pushes = shift(pawns, push) & empty
+        double_pushes = shift(single_pushes & ROW_MASKS[double_push_row], push) & empty
+        # pawns on the edge files would wrap around the board so they are left out of the captures towards that edge
+        captures_a_side = shift(pawns & ~FILE_MASKS[0], capture_a_side) & enemy_occ
+        captures_h_side = shift(pawns & ~FILE_MASKS[7], capture_h_side) & enemy_occ
+
+        for targets, offset in ((single_pushes, push), (double_pushes, 2 * push), (captures_a_side, capture_a_side), (captures_h_side, capture_h_side)):
+            targets &= allowed
+            while targets:
+                target = (targets & -targets).bit_length() - 1
+                start = target - offset
+                if ROW_MASKS[promotion_row] >> target & 1:   # if we have a promotion case
+                    for piece in PROMOTION_PIECES:
+                        moves.append((start >> 3, start & 7, target >> 3, target & 7, piece))
                 else:   # regular non-promotion moves
-                    moves.append(Move(self, (row, col, row + direction, col)))
-
-                # moving 2 squares forward
-                if ((row == 6 and color == 'w') or (row == 1 and color == 'b')) and self.board_array[row + 2 * direction][col] == '--':
-                    moves.append(Move(self, (row, col, row + 2 * direction, col)))
+                    moves.append((start >> 3, start & 7, target >> 3, target & 7, None))
+                targets &= targets - 1
 
-        # Check diagonal captures
-        for d_col in (-1, 1):
-            if 0 <= col + d_col < 8 and 0 <= row + direction < 8:
-                if self.board_array[row + direction][col + d_col][0] == ('b' if color == 'w' else 'w'):
-                    if (color == 'w' and row-1 == 0) or (color == 'b' and row+1 == 7):   # if we have a promotion case with capturing
-                        for piece in ['Q', 'N', 'R', 'B']:
-                            moves.append(Move(self, (row, col, row + direction, col + d_col), promoted_piece=piece))
-                    else:   # regular capture
-                        moves.append(Move(self, (row, col, row + direction, col + d_col)))
-
-                elif (row + direction, col + d_col) == self.en_passant_square:   # if we can en passant capture
-                    moves.append(Move(self, (row, col, row + direction, col + d_col)))
+        # en passant is not restricted by the allowed squares as get_legal_moves verifies it separately
+        if self.en_passant_square is not None:
+            en_passant_row, en_passant_col = self.en_passant_square
+            # our pawns that can capture are on the squares an enemy pawn on the en passant square would attack
+            capturers = PAWN_ATTACKS[enemy_color][en_passant_row * 8 + en_passant_col] & pawns
+            while capturers:
+                start = (capturers & -capturers).bit_length() - 1
+                moves.append((start >> 3, start & 7, en_passant_row, en_passant_col, None))   # if we can en passant capture
+                capturers &= capturers - 1
 
         return moves
 
-    def get_rook_moves(self, row: int, col: int, moves: list) -> list[Move]:
+    def get_rook_moves(self, row: int, col: int, moves: list, allowed: int = FULL) -> list[tuple]:
         '''
-        Creates a list of move objects that are associated with rooks which means:
+        Creates a list of moves that are associated with rooks which means:
             1. Vertical movement
             2. Horizontal movement
 
         Args:
             row (int): row index of board array
             col (int): column index of board array
-            moves (list[Move]): a list of existing moves
+            moves (list[tuple]): a list of existing moves as (start_row, start_col, end_row, end_col, promoted_piece) tuples
+            allowed (int, optional): Bitboard of the destinations the piece is allowed to move to
 
         Returns:
-            list[Move]: A list of move objects with rook moves combined
-        '''
-        directions = [(1, 0), (-1, 0), (0, 1), (0, -1)]  # Define all possible directions for rook moves
-
-        for dr, dc in directions:
-            r, c = row + dr, col + dc
-            while 0 <= r < 8 and 0 <= c < 8:
-                if self.board_array[r][c] == '--':  # If the square is empty, add the move
-                    moves.append(Move(self, (row, col, r, c)))
-                elif self.board_array[r][c][0] != self.board_array[row][col][0]:  # If the square has an opponent's piece, add the move and stop
-                    moves.append(Move(self, (row, col, r, c)))
-                    break
-                else:  # If the square has own piece, stop
-                    break
-                r, c = r + dr, c + dc
+            list[tuple]: A list of move tuples with rook moves combined
+        '''
+        # the attacked squares stop at the first piece on each ray, own pieces are then removed from the targets
+        own_occ = self.white_occ if self.white_occ >> (row * 8 + col) & 1 else self.black_occ
+        targets = rook_attacks(row * 8 + col, self.occ) & ~own_occ & allowed
+
+        while targets:
+            target = (targets & -targets).bit_length() - 1   # index of the lowest set bit
+            moves.append((row, col, target >> 3, target & 7, None))
+            targets &= targets - 1
 
         return moves
 
-    def get_bishop_moves(self, row: int, col: int, moves: list) -> list[Move]:
+    def get_bishop_moves(self, row: int, col: int, moves: list, allowed: int = FULL) -> list[tuple]:
         '''
-        Creates a list of move objects that are associated with bishops which means:
+        Creates a list of moves that are associated with bishops which means:
             1. diagonal right movement
             2. diagonal left movement
 
         Args:
             row (int): row index of board array
             col (int): column index of board array
-            moves (list[Move]): a list of existing moves
+            moves (list[tuple]): a list of existing moves as (start_row, start_col, end_row, end_col, promoted_piece) tuples
+            allowed (int, optional): Bitboard of the destinations the piece is allowed to move to
 
         Returns:
-            list[Move]: A list of move objects with bishop moves combined
-        '''
-        directions = [(1, 1), (-1, 1), (1, -1), (-1, -1)]  # Define all possible diagonal directions for bishop moves
-
-        for dr, dc in directions:
-            r, c = row + dr, col + dc
-            while 0 <= r < 8 and 0 <= c < 8:
-                if self.board_array[r][c] == '--':  # If the square is empty, add the move
-                    moves.append(Move(self, (row, col, r, c)))
-                elif self.board_array[r][c][0] != self.board_array[row][col][0]:  # If the square has an opponent's piece, add the move and stop
-                    moves.append(Move(self, (row, col, r, c)))
-                    break
-                else:  # If the square has own piece, stop
-                    break
-                r, c = r + dr, c + dc
+            list[tuple]: A list of move tuples with bishop moves combined
+        '''
+        own_occ = self.white_occ if self.white_occ >> (row * 8 + col) & 1 else self.black_occ
+        targets = bishop_attacks(row * 8 + col, self.occ) & ~own_occ & allowed
+
+        while targets:
+            target = (targets & -targets).bit_length() - 1   # index of the lowest set bit
+            moves.append((row, col, target >> 3, target & 7, None))
+            targets &= targets - 1
 
         return moves
 
-    def get_queen_moves(self, row: int, col: int, moves: list) -> list[Move]:
+    def get_queen_moves(self, row: int, col: int, moves: list, allowed: int = FULL) -> list[tuple]:
         '''
-        Creates a list of move objects that are associated with queens which means:
+        Creates a list of moves that are associated with queens which means:
             1. Vertical movement
             2. Horizontal movement
             3. diagonal movement
@@ -698,98 +995,106 @@ class Board:
         Args:
             row (int): row index of board array
             col (int): column index of board array
-            moves (list[Move]): a list of existing moves
+            moves (list[tuple]): a list of existing moves as (start_row, start_col, end_row, end_col, promoted_piece) tuples
+            allowed (int, optional): Bitboard of the destinations the piece is allowed to move to
 
         Returns:
-            list[Move]: A list of move objects with queen moves combined
+            list[tuple]: A list of move tuples with queen moves combined
         '''
-        # simple way to do this is just treat it as both a rook and a bishop
-        self.get_rook_moves(row, col, moves)
-        self.get_bishop_moves(row, col, moves)
+        # the queen attacks what a rook and a bishop on its square would, both lookups are combined into one set of targets
+        square = row * 8 + col
+        own_occ = self.white_occ if self.white_occ >> square & 1 else self.black_occ
+        targets = (rook_attacks(square, self.occ) | bishop_attacks(square, self.occ)) & ~own_occ & allowed
+
+        while targets:
+            target = (targets & -targets).bit_length() - 1   # index of the lowest set bit
+            moves.append((row, col, target >> 3, target & 7, None))
+            targets &= targets - 1
+
         return moves
 
-    def get_knight_moves(self, row: int, col: int, moves: list) -> list[Move]:
+    def get_knight_moves(self, row: int, col: int, moves: list, allowed: int = FULL) -> list[tuple]:
         '''
-        Creates a list of move objects that are associated with knights which means:
+        Creates a list of moves that are associated with knights which means:
             L-Shape moves or 2 squares forward and one sideways(or the other way around)
 
         Args:
             row (int): row index of board array
             col (int): column index of board array
-            moves (list[Move]): a list of existing moves
+            moves (list[tuple]): a list of existing moves as (start_row, start_col, end_row, end_col, promoted_piece) tuples
+            allowed (int, optional): Bitboard of the destinations the piece is allowed to move to
 
         Returns:
-            list[Move]: A list of move objects with knight moves combined
+            list[tuple]: A list of move tuples with knight moves combined
         '''
-        # Define all possible knight move directions
-        knight_moves = [(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)]
-
-        for dr, dc in knight_moves:
-            r, c = row + dr, col + dc
-            if 0 <= r < 8 and 0 <= c < 8:
-                if self.board_array[r][c] == '--' or self.board_array[r][c][0] != self.board_array[row][col][0]:
-                    moves.append(Move(self, (row, col, r, c)))
+        # the jumps from every square are precomputed so there are no bounds checks here
+        own_occ = self.white_occ if self.white_occ >> (row * 8 + col) & 1 else self.black_occ
+        targets = KNIGHT_ATTACKS[row * 8 + col] & ~own_occ & allowed
+        while targets:
+            target = (targets & -targets).bit_length() - 1
+            moves.append((row, col, target >> 3, target & 7, None))
+            targets &= targets - 1
 
         return moves
 
-    def get_king_moves(self, row: int, col: int, moves: list) -> list[Move]:
+    def get_king_moves(self, row: int, col: int, moves: list, allowed: int = FULL) -> list[tuple]:
         '''
-        Creates a list of move objects that are associated with kings which means:
+        Creates a list of moves that are associated with kings which means:
             1. Moving to adjacent squares
             2. Kingside and Queenside castling
 
         Args:
             row (int): row index of board array
             col (int): column index of board array
-            moves (list[Move]): a list of existing moves
+            moves (list[tuple]): a list of existing moves as (start_row, start_col, end_row, end_col, promoted_piece) tuples
+            allowed (int, optional): Bitboard of the destinations the piece is allowed to move to
 
         Returns:
-            list[Move]: A list of move objects with king moves combined
+            list[tuple]: A list of move tuples with king moves combined
         '''
-        # Define all possible king move directions
-        king_moves = [(1, 0), (-1, 0), (0, 1), (0, -1),
-                    (1, 1), (1, -1), (-1, 1), (-1, -1)]
-
-        for dr, dc in king_moves:
-            r, c = row + dr, col + dc
-            if 0 <= r < 8 and 0 <= c < 8:
-                if self.board_array[r][c] == '--' or self.board_array[r][c][0] != self.board_array[row][col][0]:
-                    moves.append(Move(self, (row, col, r, c)))
+        # the adjacent squares of every square are precomputed so there are no bounds checks here
+        own_occ = self.white_occ if self.white_occ >> (row * 8 + col) & 1 else self.black_occ
+        targets = KING_ATTACKS[row * 8 + col] & ~own_occ & allowed
+        while targets:
+            target = (targets & -targets).bit_length() - 1
+            moves.append((row, col, target >> 3, target & 7, None))
+            targets &= targets - 1
 
         return moves
 
-    def get_castling_moves(self, row: int, col: int, moves: list) -> list[Move]:
+    def get_castling_moves(self, row: int, col: int, moves: list, attacked: int) -> list[Move]:
         '''
         this function will update the moves list by adding castling moves in it, there are 3 conditions for that
-            1. The king should have the specific castling rights(see castling rights class for details)
+            1. The king should have the specific castling rights(see castling rights class for details), a right is only
+               kept while the king and that rook are on their home squares so the masks below are for those squares
             2. The king shouldn't be in check
-            3. The 2 adjacent squares towards the side of castling shouldn't be under attack and should be empty
+            3. The 2 adjacent squares towards the side of castling shouldn't be under attack and the squares between
+               the king and the rook should be empty
+
+        Each side is checked with one bit test for the empty squares and one against the opponent attacks
 
         Args:
             row (int): position of the king
             col (int): position of the king
             moves (list[Move]): The existing list with all the moves in it
+            attacked (int): Bitboard of the squares attacked by the opponent, see attacked_squares
 
         Returns:
             list[Move]: The updated list with castling moves
         '''
-        # one possible approach was to add this function in the get king moves function but that lead to infinite recursion:
-        # in_check -> square_under_attack -> get_psuedo_legal_moves -> get_king_moves -> get_king_moves -> get_castling_moves -> back to start
-        # therefore this is a separate function called before validating legal moves
-
-        if self.in_check():
-            return moves   # cannot castle if the king is in check
-
-        if (self.white_to_move and self.castling_rights.has_rights('K')) or \
-            (not self.white_to_move and self.castling_rights.has_rights('k')):   # kingside castling
-            if self.board_array[row][col+1] == self.board_array[row][col+2] == '--' and \
-                not self.square_under_attack(row, col+1) and not self.square_under_attack(row, col+2):   # if 2 right squares are empty and not under attack
-                moves.append(Move(self, (row, col, row, col+2), is_castling=True))
-
-        if (self.white_to_move and self.castling_rights.has_rights('Q')) or \
-            (not self.white_to_move and self.castling_rights.has_rights('q')):   # queenside castling
-            if self.board_array[row][col-1] == self.board_array[row][col-2] == '--' and \
-                not self.square_under_attack(row, col-1) and  not self.square_under_attack(row, col-2):   # if 2 left are empty and not under attack
-                moves.append(Move(self, (row, col, row, col-2), is_castling=True))
+        # this is kept out of get_king_moves as it needs the attack tests and get_legal_moves only calls it when not in check
+        color = WHITE if self.white_to_move else BLACK
+        kingside_bit, queenside_bit = CASTLING_SIDE_BITS[color]
+        rights = self.castling_rights.rights
+        if not rights & (kingside_bit | queenside_bit):
+            return moves   # most of the game is played without any castling rights left
+
+        # the rook passes the square next to it so all 3 squares have to be empty on the queenside
+        (kingside_empty, kingside_safe), (queenside_empty, queenside_safe) = CASTLING_MASKS[color]
+        if rights & kingside_bit and not self.occ & kingside_empty and not attacked & kingside_safe:
+            moves.append(Move(self, (row, col, row, col+2), is_castling=True))
+
+        if rights & queenside_bit and not self.occ & queenside_empty and not attacked & queenside_safe:
+            moves.append(Move(self, (row, col, row, col-2), is_castling=True))
 
         return moves
\ No newline at end of file
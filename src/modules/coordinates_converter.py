@@ -16,13 +16,13 @@ def coordinates_converter(coordinates: Union[tuple, list], pov: bool, SQUARE_SIZ
     Returns:
         tuple: The coordinates converted to index coordinates
     '''
-    if pov:
-        # Ensure the result is within the range [0, 7]
-        x = round(max(0, min(7, (coordinates[0] - PADDING) // SQUARE_SIZE)))
-        y = round(max(0, min(7, (coordinates[1] - PADDING) // SQUARE_SIZE)))
-    else:
-        # Ensure the result is within the range [0, 7]
-        x = round(max(0, min(7, 7 - (coordinates[0] - PADDING) // SQUARE_SIZE)))
-        y = round(max(0, min(7, 7 - (coordinates[1] - PADDING) // SQUARE_SIZE)))
+    # floor division of the pixel coordinates already gives whole numbers, int covers float inputs
+    x = int((coordinates[0] - PADDING) // SQUARE_SIZE)
+    y = int((coordinates[1] - PADDING) // SQUARE_SIZE)
+    # Ensure the result is within the range [0, 7], comparisons are cheaper than calling min and max
+    x = 0 if x < 0 else 7 if x > 7 else x
+    y = 0 if y < 0 else 7 if y > 7 else y
+    if not pov:   # the black perspective flips both axes
+        x, y = 7 - x, 7 - y
 
     return (y, x)
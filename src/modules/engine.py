@@ -4,6 +4,8 @@ import chess
 import chess.engine
 import subprocess
 import os
+import threading
+from collections import OrderedDict
 from utilities.resource_path import resource_path
 from modules.engine_lines import EngineLine
 
@@ -12,6 +14,81 @@ number_of_lines = 5
 initial_depth = 10
 moves_per_line = 5
 
+# starting stockfish and loading its network takes longer than a shallow analysis so one process is kept
+# for the whole program, the lock stops the analysis threads of the gui from sending commands at the same time.
+# The engine runs on a background thread that keeps python alive so close_engine has to be called before exiting
+_engine = None
+_engine_lock = threading.Lock()
+# _engine_lock is held for a whole analysis, this one only guards starting, swapping out and closing the engine so
+# quitting it never waits for an analysis and two threads quitting it never both get the same engine
+_engine_swap_lock = threading.Lock()
+_closed = False   # set by close_engine so an analysis that was still waiting for the lock can't start a new engine
+# the stop event and the engine search of the analysis that is running, so stop_analysis can stop the search itself
+_running_analysis = None
+_running_lock = threading.Lock()
+
+# finished analyses are kept so going back to a position (undo, flipping the board, pasting the same fen) shows its
+# lines at once, the least recently used ones are dropped once there are cache_size of them
+cache_size = 512
+_lines_cache = OrderedDict()
+_cache_lock = threading.Lock()   # looking up the cache never waits for the analysis that holds _engine_lock
+
+def position_key(fen: str) -> str:
+    '''
+    Gives the part of a fen that the analysis depends on, the move counters are left out unless the
+    fifty move rule is close enough to change the evaluation
+
+    Args:
+        fen (str): The position
+
+    Returns:
+        str: The fen without the counters that don't matter
+    '''
+    fields = fen.split()
+    if len(fields) > 4 and int(fields[4]) >= 80:
+        return ' '.join(fields[:5])
+    return ' '.join(fields[:4])
+
+def get_engine(path=path):
+    '''
+    Gives the running engine, starting it on the first call
+
+    Args:
+        path (str): Path of the stockfish executable, only used when the engine is started
+
+    Returns:
+        chess.engine.SimpleEngine: The engine process shared by every analysis
+    '''
+    global _engine
+    with _engine_swap_lock:
+        if _closed:
+            raise chess.engine.EngineTerminatedError('the engine was closed')
+        if _engine is None:
+            # Define creation flags for suppressing the console window on Windows
+            creation_flags = 0
+            if os.name == 'nt':  # Check if the system is Windows
+                creation_flags = subprocess.CREATE_NO_WINDOW
+            _engine = chess.engine.SimpleEngine.popen_uci(path, creationflags=creation_flags)
+        return _engine
+
+def close_engine():
+    '''Quits the engine for good when the program is exiting, any analysis after this fails instead of starting a new engine'''
+    global _closed
+    with _engine_swap_lock:
+        _closed = True
+    _quit_engine()
+
+def _quit_engine():
+    '''Quits the engine if it is running, the next analysis will start a new one'''
+    global _engine
+    with _engine_swap_lock:
+        engine, _engine = _engine, None   # only the caller that takes the engine out quits it
+    if engine is not None:
+        try:
+            engine.quit()
+        except (chess.engine.EngineError, chess.engine.EngineTerminatedError):
+            pass   # the process is already gone
+
 def format_eval(score, is_white_to_move):
     """
     Format the evaluation score.
@@ -43,53 +120,141 @@ def trim_lines(lines: list, max_index: int = moves_per_line):
         list of EngineLine: Trimmed lines.
     """
     for line in lines:
-        while len(line) > max_index:
-            line.remove_move(-1)  # Remove the last move until the length is 5 or less
+        if len(line) > max_index:
+            line.truncate(max_index)  # Remove the moves after the first 5 at once
     return lines
 
-def get_top_lines(fen: str, max_depth, path=path, number_of_lines=number_of_lines):
-    '''Get the top lines from the engine for a given depth.'''
-    try:
-        top_lines = []
-        seen_lines = set()  # Set to track unique lines
+def format_lines(board: chess.Board, infos: list, number_of_lines: int = number_of_lines) -> list:
+    """
+    Converts the principal variations of the engine to lines of san moves, lines that are repeated or have
+    an illegal move are skipped
 
-        # Define creation flags for suppressing the console window on Windows
-        creation_flags = 0
-        if os.name == 'nt':  # Check if the system is Windows
-            creation_flags = subprocess.CREATE_NO_WINDOW
+    Args:
+        board (chess.Board): The analysed position.
+        infos (list of dict): The engine info of each principal variation, best first.
+        number_of_lines (int): The maximum number of lines.
 
-        with chess.engine.SimpleEngine.popen_uci(path, creationflags=creation_flags) as engine:
-            board = chess.Board(fen)
+    Returns:
+        list of EngineLine: The lines, trimmed to moves_per_line moves.
+    """
+    top_lines = []
+    seen_lines = set()  # Set to track unique lines
+    lines_seen = 0
+    for info in infos:
+        # only the moves that are shown are converted, a deep principal variation can be many times longer
+        moves = tuple(info.get('pv', ())[:moves_per_line])
+        # Check if the line is unique before converting it, chess moves hash by their squares so this is cheaper than comparing san
+        if moves in seen_lines:
+            continue
+
+        line = []
+        board_copy = board.copy(stack=False)   # the move history is not needed for san
+        for move in moves:
+            if not board_copy.is_legal(move):
+                print(f"Illegal move detected: {move} in {board_copy.fen()}")
+                break
+            line.append(board_copy.san_and_push(move))
+
+        else:
+            eval_score = format_eval(info['score'], board.turn)
+            top_lines.append(EngineLine(lines_seen + 1, line, eval_score))
+            seen_lines.add(moves)  # Add tuple to set of seen lines
+            lines_seen += 1
+            if lines_seen == number_of_lines:
+                break
+
+    return trim_lines(top_lines)
 
+def stop_analysis(stop: threading.Event) -> None:
+    '''
+    Marks an analysis as not needed anymore and stops its engine search if it is running, the search ends as soon as
+    the engine reads the command instead of after the depth it is on so the next analysis gets the engine quickly
+
+    Args:
+        stop (threading.Event): The stop event that was given to analyse_top_lines
+    '''
+    with _running_lock:
+        stop.set()
+        if _running_analysis is not None and _running_analysis[0] is stop:
             try:
-                result = engine.analyse(board, chess.engine.Limit(depth=max_depth), multipv=number_of_lines)
-
-                lines_seen = 0
-                for info in result:
-                    line = []
-                    board_copy = board.copy()
-                    for move in info['pv']:
-                        if not board_copy.is_legal(move):
-                            print(f"Illegal move detected: {move} in {board_copy.fen()}")
-                            break
-                        line.append(board_copy.san(move))
-                        board_copy.push(move)
-
-                    else:
-                        # Check if the line is unique using tuple representation (san moves in tuple format)
-                        line_tuple = tuple(line)
-                        if line_tuple not in seen_lines:
-                            eval_score = format_eval(info['score'], board.turn)
-                            top_lines.append(EngineLine(lines_seen + 1, line, eval_score))
-                            seen_lines.add(line_tuple)  # Add tuple to set of seen lines
-                            lines_seen += 1
-                            if lines_seen == number_of_lines:
-                                break
-
-            finally:
-                engine.quit()
+                _running_analysis[1].stop()
+            except chess.engine.EngineTerminatedError:
+                pass   # the engine is already gone so the analysis is ending anyway
+
+def analyse_top_lines(fen: str, max_depth, path=path, number_of_lines=number_of_lines, on_lines=None, stop: threading.Event = None) -> list:
+    '''
+    Gets the top lines from the engine, on_lines is called with a new set of lines every time the engine finishes a depth
+    so the first lines are ready almost at once and the last ones are for max_depth
+
+    Args:
+        fen (str): The position to analyse.
+        max_depth (int): The depth to stop at.
+        path (str): Path of the stockfish executable.
+        number_of_lines (int): The number of lines to ask the engine for.
+        on_lines (callable, optional): Called with the lines of each depth on the thread of the analysis while it holds
+                                       the engine, so it should only hand the lines over.
+        stop (threading.Event, optional): Passed to stop_analysis when the lines are not needed anymore.
+
+    Returns:
+        list of EngineLine: The lines of the last depth that was finished, empty if there are none.
+    '''
+    global _running_analysis
+    board = chess.Board(fen)
+    # a position with fewer legal moves than lines asked for only gets as many lines as it has moves
+    expected_lines = min(number_of_lines, board.legal_moves.count())
+    if not expected_lines:
+        return []
+
+    key = (position_key(fen), max_depth, number_of_lines)
+    with _cache_lock:
+        cached_lines = _lines_cache.get(key)
+        if cached_lines is not None:
+            _lines_cache.move_to_end(key)
+    if cached_lines is not None:
+        if on_lines is not None:
+            on_lines(cached_lines)
+        return cached_lines
+
+    if stop is None:
+        stop = threading.Event()   # never set, the analysis runs to max_depth
+    top_lines = []
+    with _engine_lock:
+        if stop.is_set():   # stopped while waiting for the analysis before it
+            return top_lines
+        try:
+            with get_engine(path).analysis(board, chess.engine.Limit(depth=max_depth), multipv=number_of_lines) as analysis:
+                with _running_lock:
+                    _running_analysis = (stop, analysis)
+                    if stop.is_set():   # stop_analysis came between the check above and now so it couldn't stop the search
+                        analysis.stop()
+                try:
+                    # the iteration ends when the engine reaches max_depth or when stop_analysis has stopped the search
+                    for info in analysis:
+                        if stop.is_set():
+                            break   # the lines the engine sent before it read the stop are not needed
+                        # the engine sends every line of a depth one after the other once the depth is done
+                        if info.get('multipv', 1) == expected_lines and 'pv' in info:
+                            top_lines = format_lines(board, analysis.multipv, number_of_lines)
+                            if on_lines is not None:
+                                on_lines(top_lines)
+                finally:
+                    with _running_lock:
+                        _running_analysis = None
+        except (chess.engine.EngineError, chess.engine.EngineTerminatedError):
+            _quit_engine()   # a crashed or stuck engine is replaced on the next call
+            raise
 
+    # only a finished analysis is cached, a stopped one never reached max_depth
+    if top_lines and not stop.is_set():
+        with _cache_lock:
+            _lines_cache[key] = top_lines
+            if len(_lines_cache) > cache_size:
+                _lines_cache.popitem(last=False)
+    return top_lines
+
+def get_top_lines(fen: str, max_depth, path=path, number_of_lines=number_of_lines):
+    '''Get the top lines from the engine for a given depth.'''
+    try:
+        return analyse_top_lines(fen, max_depth, path, number_of_lines)
     except Exception as e:
-        pass
-    finally:
-        return trim_lines(top_lines)
+        return []
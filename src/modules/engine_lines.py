@@ -30,7 +30,7 @@ class EngineLine:
         Returns:
             str: A string representation of the EngineLine object.
         """
-        return f"Line {self.index}: {', '.join(self.line)}, Eval: {self.eval_score}"
+        return f"Line {self.index}: {', '.join(self.line)}, Eval: {self.eval}"
 
     def __repr__(self):
         """
@@ -39,7 +39,7 @@ class EngineLine:
         Returns:
             str: A string representation of the EngineLine object.
         """
-        return f"Line {self.index}: {', '.join(self.line)}, Eval: {self.eval_score}"
+        return f"Line {self.index}: {', '.join(self.line)}, Eval: {self.eval}"
 
     def __len__(self):
         """
@@ -91,6 +91,15 @@ class EngineLine:
             move_index (int): The index of the move to be removed.
         """
         del self.line[move_index]
+
+    def truncate(self, length: int) -> None:
+        """
+        Remove every move after the given number of moves in one step.
+
+        Args:
+            length (int): The number of moves to keep.
+        """
+        del self.line[length:]
         
     def get_single_string(self) -> str:
         """
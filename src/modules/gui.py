@@ -60,38 +60,47 @@ This file serves as the core of the graphical interface for the chess game, faci
 
 # unfinished, stockfish integration is buggy and needs terminations management, initialization error handling and the option to play stockfish
 
-import sys, os, pygame, pyperclip, threading, time, psutil, signal
+import sys, os, pygame, pyperclip, threading, psutil, signal, functools, concurrent.futures
 from utilities.resource_path import resource_path
-from modules.board import Board
+from modules.board import Board, PIECES
 from modules.move import Move
 from modules.coordinates_converter import coordinates_converter
-from modules.engine import get_top_lines
-import sys, os
-try:
-    pass
-except ImportError as e:
-    print(f'Error importing modules: {e}')
-    sys.exit()
+from modules.engine import analyse_top_lines, stop_analysis, close_engine
 
 pygame.init()
+# events that the program never handles are kept out of the queue, the touchpad sends finger events along with every mouse motion
+pygame.event.set_blocked([pygame.KEYUP, pygame.TEXTINPUT, pygame.TEXTEDITING, pygame.FINGERDOWN, pygame.FINGERUP, pygame.FINGERMOTION,
+                          pygame.MULTIGESTURE])
 
 # Get screen size
 SCREEN_WIDTH, SCREEN_HEIGHT = pygame.display.Info().current_w, pygame.display.Info().current_h
 ASPECT_RATIO = SCREEN_WIDTH / SCREEN_HEIGHT
-window_width, window_height = SCREEN_WIDTH * 0.8, SCREEN_HEIGHT * 0.8   # 80 percent of the screen size initially to keep some room for taskbar and close button 
+window_width, window_height = int(SCREEN_WIDTH * 0.8), int(SCREEN_HEIGHT * 0.8)   # 80 percent of the screen size initially to keep some room for taskbar and close button 
 
-# setting up board dimensions
-BOARD_WIDTH = BOARD_HEIGHT = window_height * (15/16)
+# setting up board dimensions, they are kept as whole pixels so every rect and blit position is an int
+BOARD_WIDTH = BOARD_HEIGHT = window_height * 15 // 16
 PADDING = BOARD_HEIGHT // 30
 SIDE_PANEL_WIDTH = window_width - BOARD_WIDTH - PADDING * 3   # keeping aspect ratio same as that of the screen
 SQUARE_SIZE = BOARD_HEIGHT // 8
-PIECE_SIZE = SQUARE_SIZE*0.9
+PIECE_SIZE = SQUARE_SIZE * 9 // 10
 SQ_PIECE_DIFFERENCE = (SQUARE_SIZE - PIECE_SIZE) // 2   # to keep the pieces aligned in the centre of the squares
 
 # other details
 MAX_FPS = 60
 IMAGES = {}   # a dictionary mapping all pieces to their respective images
 SOUNDS = {}   # a similar dictionary for sounds
+ICONS = {}   # the engine and button icons, scaled to their size on the screen
+SQUARE_POSITIONS = {}   # pixel positions of the squares and the pieces on them, see load_square_positions
+PIECE_POSITIONS = {}
+# the areas of the side panel that react to the mouse, they only change with the window size so they are worked out
+# once for each size by rebuild_ui_rects instead of being checked with the same sums on every click and frame
+BUTTON_RECTS = []   # (icon name, rect) of each button from top to bottom
+BUTTON_TOOLTIPS = {'copy': 'Copy FEN', 'paste': 'Paste FEN', 'flip': 'Flip Perspective', 'light': 'Toggle Theme'}
+DEPTH_RECT = None   # the depth text of the engine panel, scrolling over it changes the depth
+FONTS = {}   # fonts by name and size, making a font reads it from disk so each one is only made once
+# areas of the screen that were drawn on during a frame, the main loop sends them all to the display at the end of the
+# frame so only what changed is updated and many draws in one frame cost one update
+DIRTY_RECTS = []
 
 # colors
 LIGHT_THEME = False
@@ -120,6 +129,7 @@ def terminate_process_tree(pid):
 
 def cleanup():
     print("Cleaning up...")
+    shutdown_engine()
     # Terminate all processes related to Stockfish
     terminate_process_tree(os.getpid())
 
@@ -131,6 +141,57 @@ def signal_handler(sig, frame):
 signal.signal(signal.SIGINT, signal_handler)
 signal.signal(signal.SIGTERM, signal_handler)
 
+def get_font(size: float, name: str = None) -> pygame.font.Font:
+    '''
+    Gives the font of the given size, it is only created the first time it is asked for. The sizes are worked out
+    from the board size by the callers so a resized window simply asks for new sizes
+
+    Args:
+        size (float): The font size, rounded down to a whole number
+        name (str, optional): A system font name, the default pygame font is used if not given
+
+    Returns:
+        pygame.font.Font: The font
+    '''
+    key = (name, int(size))
+    font = FONTS.get(key)
+    if font is None:
+        font = FONTS[key] = pygame.font.SysFont(name, key[1]) if name else pygame.font.Font(None, key[1])
+    return font
+
+@functools.lru_cache(maxsize=512)
+def render_text(font: pygame.font.Font, text: str, color: tuple) -> pygame.Surface:
+    '''
+    Renders antialiased text, the surfaces are cached as the same labels(coordinates, panel titles, messages, move numbers,
+    moves and engine lines) are drawn again on every redraw. Fonts come from get_font so the same font is always the same object
+
+    Args:
+        font (pygame.font.Font): The font to render with
+        text (str): The text
+        color (tuple): The text color
+
+    Returns:
+        pygame.Surface: The rendered text, it is shared so it should only be blitted and not drawn on
+    '''
+    return font.render(text, True, color)
+
+@functools.lru_cache(maxsize=8)
+def transparent_square(size: float, color: tuple) -> pygame.Surface:
+    '''
+    Makes a square filled with a semi-transparent color for highlighting squares, cached as the same few colors are drawn
+    on every piece selection and every frame of dragging. The size is part of the key so resizing the window makes new ones
+
+    Args:
+        size (float): The side of the square, SQUARE_SIZE
+        color (tuple): The color with its alpha value
+
+    Returns:
+        pygame.Surface: The square, it is shared so it should only be blitted and not drawn on
+    '''
+    square = pygame.Surface((size, size), pygame.SRCALPHA)
+    square.fill(color)
+    return square
+
 def display_message(window, message: str, color:tuple = (255, 0, 0), duration: int =1000):
     """
     Display a message on the given window with a semi-transparent background.
@@ -141,8 +202,8 @@ def display_message(window, message: str, color:tuple = (255, 0, 0), duration: i
         color (tuple, optional): The color of the text. Defaults to (255, 0, 0) (red).
         duration (int, optional): The duration in milliseconds for which the message should be displayed. Defaults to 1000ms (1 second).
     """
-    font = pygame.font.Font(None, 36)  # Smaller font size
-    text = font.render(message, True, color)
+    font = get_font(36)  # Smaller font size
+    text = render_text(font, message, color)
     text_rect = text.get_rect(center=(window.get_width() // 2, window.get_height() // 2))
 
     # Create a semi-transparent background without padding and with rounded edges
@@ -157,10 +218,10 @@ def display_message(window, message: str, color:tuple = (255, 0, 0), duration: i
     window.blit(background_surface, background_rect.topleft)
     window.blit(text, text_rect)
 
-    pygame.display.update()
+    pygame.display.update(background_rect)   # updated at once as the message has to be seen while we wait
     pygame.time.wait(duration)
 
-def draw_text_box(text: str, pos: tuple) -> None:
+def draw_text_box(text: str, pos: tuple) -> pygame.Rect:
     """
     Draws a  text box with the given text at the specified position on the screen.
 
@@ -169,11 +230,10 @@ def draw_text_box(text: str, pos: tuple) -> None:
         pos (tuple): The top-left position of the text box on the screen.
 
     Returns:
-        None
+        pygame.Rect: The area of the text box, see erase_text_box
     """
-    pygame.font.init()
-    font = pygame.font.SysFont('Arial', 13)  # Set font size to 12
-    text_surface = font.render(text, True, (0, 0, 0))
+    font = get_font(13, 'Arial')  # cached so the system font is only looked up on the first tooltip
+    text_surface = render_text(font, text, (0, 0, 0))   # the same few tooltips are drawn on every frame the mouse is over them
     text_rect = text_surface.get_rect(bottomleft=pos)
     box_rect = text_rect.inflate(5, 2)  # Add smaller padding around the text
 
@@ -182,7 +242,25 @@ def draw_text_box(text: str, pos: tuple) -> None:
     pygame.draw.rect(screen, (0, 0, 0), box_rect, 1)  # Border
     screen.blit(text_surface, text_rect)
 
-    pygame.display.flip()
+    DIRTY_RECTS.append(box_rect)
+    return box_rect
+
+def erase_text_box(box_rect: pygame.Rect) -> None:
+    '''
+    Removes a text box from the side panel by drawing the panel again with the screen clipped to the box, so only the
+    pixels under it change. The panel can change under a text box that is shown so a copy of what was there would be stale
+
+    Args:
+        box_rect (pygame.Rect): The area of the text box, as given by draw_text_box
+    '''
+    dirty_count = len(DIRTY_RECTS)
+    screen.set_clip(box_rect)
+    screen.fill(PADDING_COLOR)   # a text box at the edge of the window also covers the padding
+    update_engine_panel()
+    update_move_log(scrolling_size)   # this draws the buttons too
+    screen.set_clip(None)
+    del DIRTY_RECTS[dirty_count:]   # the panel parts add their whole areas but only the box has changed
+    DIRTY_RECTS.append(box_rect)
 
 def load_images() -> None:
     '''
@@ -196,18 +274,64 @@ def load_images() -> None:
             image_path = os.path.join('assets', 'images', 'pieces', f'{piece}.png')
             full_image_path = resource_path(image_path)  # Resolve the full path for both dev and production
             
-            # Check if the file exists
-            if not os.path.exists(full_image_path):
-                print(f'Could not find image file: {full_image_path}')
+            # Load the image, a missing file is reported by the loader itself so the path isn't checked separately first.
+            # It is scaled to whole pixels and converted to the pixel format of the screen so blitting it doesn't convert every pixel
+            try:
+                image = pygame.image.load(full_image_path)
+            except (FileNotFoundError, pygame.error) as e:
+                print(f'Could not load image file: {full_image_path} ({e})')
                 sys.exit()
-            
-            # Load the image
-            IMAGES[piece] = pygame.transform.smoothscale(pygame.image.load(full_image_path), (PIECE_SIZE, PIECE_SIZE))
+            IMAGES[piece] = pygame.transform.smoothscale(image, (PIECE_SIZE, PIECE_SIZE)).convert_alpha()
     
     except Exception as e:
         print(f'Error loading images: {e}')
         sys.exit()
 
+def load_square_positions() -> None:
+    '''
+    Works out the top left pixel of every square and of the piece drawn on it for both perspectives, these only change
+    when the window is resized so this is called again then instead of multiplying the coordinates on every redraw.
+    Both tables are indexed by pov then the square on the board(row * 8 + col, the same as board.squares and
+    move.end_square), so callers don't have to flip the coordinates
+    '''
+    offset = PADDING + SQ_PIECE_DIFFERENCE
+    for pov in (True, False):
+        SQUARE_POSITIONS[pov] = tuple(((column if pov else 7 - column) * SQUARE_SIZE + PADDING, (row if pov else 7 - row) * SQUARE_SIZE + PADDING)
+                                      for row in range(8) for column in range(8))
+        PIECE_POSITIONS[pov] = tuple(((column if pov else 7 - column) * SQUARE_SIZE + offset, (row if pov else 7 - row) * SQUARE_SIZE + offset)
+                                     for row in range(8) for column in range(8))
+
+def load_icons() -> None:
+    '''
+    Initialize a global dictionary of icons, they are scaled once here instead of on every redraw
+    so this is called again when the window is resized
+    '''
+    icon_sizes = {'engine': PADDING * 4, 'copy': PADDING * 3, 'paste': PADDING * 3, 'flip': PADDING * 3, 'light': PADDING * 3}
+
+    try:
+        for icon, size in icon_sizes.items():
+            image_path = os.path.join('assets', 'images', f'{icon}_icon.png')
+            ICONS[icon] = pygame.transform.smoothscale(pygame.image.load(resource_path(image_path)), (size, size)).convert_alpha()
+
+    except Exception as e:
+        print(f'Error loading icons: {e}')
+        sys.exit()
+
+def rebuild_ui_rects() -> None:
+    '''
+    Works out the rects of the buttons and the depth text for the current window size, the icons have to be loaded first
+    '''
+    global DEPTH_RECT
+    BUTTON_RECTS.clear()
+    for i, icon in enumerate(BUTTON_TOOLTIPS):
+        BUTTON_RECTS.append((icon, pygame.Rect(window_width - PADDING * 4, BOARD_HEIGHT // 2 + PADDING * (1 + i * 4), PADDING * 3, PADDING * 3)))
+
+    depth_text_surface = render_text(get_font(BOARD_HEIGHT * 1/20), f"Depth: {engine_depth}", TEXT_COLOR)
+    icon_center_y = PADDING + ICONS['engine'].get_height() // 2
+    text_y = icon_center_y - depth_text_surface.get_height() + PADDING * 1.5
+    text_x = BOARD_WIDTH + PADDING * 2 + ICONS['engine'].get_width() + PADDING
+    DEPTH_RECT = pygame.Rect((text_x, text_y), depth_text_surface.get_size())
+
 def load_sounds() -> None:
     '''
     Initialize a global directory of sounds.
@@ -221,23 +345,31 @@ def load_sounds() -> None:
             sound_path = os.path.join('assets', 'sounds', f'{sound}.mp3')
             full_sound_path = resource_path(sound_path)  # Resolve the full path for both dev and production
             
-            # Check if the file exists
-            if not os.path.exists(full_sound_path):
-                print(f'Could not find sound file: {full_sound_path}')
+            # Load the sound, a missing file is reported by the loader itself so the path isn't checked separately first
+            try:
+                SOUNDS[sound] = pygame.mixer.Sound(full_sound_path)
+            except (FileNotFoundError, pygame.error) as e:
+                print(f'Could not load sound file: {full_sound_path} ({e})')
                 sys.exit()
-            
-            # Load the sound
-            SOUNDS[sound] = pygame.mixer.Sound(full_sound_path)
     
     except Exception as e:
         print(f'Error loading sound: {e}')
         sys.exit()
 
+BOARD_BACKGROUNDS = {}   # the drawn empty board for each perspective, theme and window size, see color_board
 def color_board(pov: bool, light: tuple = LIGHT_SQ, dark: tuple = DARK_SQ) -> None:
     '''
     Draw the squares on the board.
     The top left square is always light.
+    The background, squares and coordinates only change when the board is flipped, the theme is changed or the
+    window is resized so they are drawn once for each of those and copied, later calls blit the copy
     '''
+    key = (pov, light, dark, PADDING_COLOR, TEXT_COLOR, screen.get_size(), BOARD_HEIGHT)
+    background = BOARD_BACKGROUNDS.get(key)
+    if background is not None:
+        screen.blit(background, (0, 0))
+        return
+
     screen.fill(PADDING_COLOR)
     global colors
     colors = [pygame.Color(light), pygame.Color(dark)]
@@ -246,17 +378,28 @@ def color_board(pov: bool, light: tuple = LIGHT_SQ, dark: tuple = DARK_SQ) -> No
             color = colors[((row + column) % 2)]
             pygame.draw.rect(screen, color, pygame.Rect(column * SQUARE_SIZE + PADDING, row * SQUARE_SIZE + PADDING, SQUARE_SIZE, SQUARE_SIZE))
     draw_coordinates(pov)
+    if len(BOARD_BACKGROUNDS) >= 4:   # both perspectives in both themes, older window sizes are dropped
+        BOARD_BACKGROUNDS.clear()
+    BOARD_BACKGROUNDS[key] = screen.copy()
 
 engine_depth = 20
 top_lines = []
+# the engine runs on its own thread but everything is drawn from the main loop as pygame isn't thread safe,
+# the thread posts the lines of each depth and the end of the analysis as events that the main loop draws.
+# A single worker runs the analyses one after another so an analysis that is replaced before it starts can be cancelled
+engine_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+engine_future = None   # None once the analysis has ended
+analysis_stop = threading.Event()   # also tells the events of the current analysis apart from those of replaced ones
+ENGINE_LINES_EVENT = pygame.event.custom_type()   # has the lines of a depth and the stop event of their analysis
+ENGINE_DONE_EVENT = pygame.event.custom_type()   # has the stop event of the analysis that ended
 def display_loading_screen():
     # Define colors
     rect_color = (179, 0, 3)  # Color for the rectangle
     text_color = TEXT_COLOR
     
     # Create the loading text
-    loading_font = pygame.font.Font(None, int(BOARD_HEIGHT * 1/20))
-    loading_text = loading_font.render("Loading...", True, text_color)
+    loading_font = get_font(BOARD_HEIGHT * 1/20)
+    loading_text = render_text(loading_font, "Loading...", text_color)
     
     # Define rectangle size and position
     text_rect = loading_text.get_rect(center=(BOARD_WIDTH + SIDE_PANEL_WIDTH // 2, BOARD_HEIGHT // 4))
@@ -266,44 +409,31 @@ def display_loading_screen():
     
     pygame.draw.rect(screen, rect_color, loading_rect, border_radius=5)
     screen.blit(loading_text, text_rect)
-    pygame.display.update(loading_rect)
-
-def run_get_top_lines(board_fen, engine_depth, result_container):
-    result_container['top_lines'] = get_top_lines(board_fen, engine_depth)
-
-def update_engine_panel(re_analyze: bool, font=pygame.font.Font(None, int(BOARD_HEIGHT * 1/20)), callback=None) -> None:
-    global top_lines
-    pygame.draw.rect(screen, ENGINE_PANEL_COLOR, pygame.Rect(BOARD_WIDTH + 2 * PADDING, PADDING, SIDE_PANEL_WIDTH, BOARD_HEIGHT // 2))
-    global engine_icon; engine_icon = pygame.transform.smoothscale(pygame.image.load(resource_path(os.path.join('assets', 'images', 'engine_icon.png'))), (PADDING * 4, PADDING * 4))
+    DIRTY_RECTS.append(loading_rect)
 
-    screen.blit(engine_icon, (BOARD_WIDTH + PADDING * 2, PADDING))
-    
-    text_surface = font.render("Stockfish 16.1", True, TEXT_COLOR)
-    icon_center_y = PADDING + engine_icon.get_height() // 2
-    text_y = icon_center_y - text_surface.get_height()
-    text_x = BOARD_WIDTH + PADDING * 2 + engine_icon.get_width() + PADDING
-    screen.blit(text_surface, (text_x, text_y))
-    screen.blit(font.render(f"Depth: {engine_depth}", True, TEXT_COLOR), (text_x, text_y + font.get_height() + PADDING // 2))
-    
-    if re_analyze:
-        # Show loading screen while running get_top_lines in a separate thread
-        result_container = {}
-        thread = threading.Thread(target=run_get_top_lines, args=(board.board_to_fen(), engine_depth, result_container))
-        thread.start()
+def run_get_top_lines(board_fen, engine_depth, stop):
+    try:
+        # the lines of every depth are sent so the panel can show them early
+        analyse_top_lines(board_fen, engine_depth, on_lines=lambda lines: pygame.event.post(pygame.event.Event(ENGINE_LINES_EVENT, lines=lines, stop=stop)),
+                          stop=stop)
+    except Exception:
+        pass
 
-        while thread.is_alive():
-            display_loading_screen()
+def draw_top_lines(font) -> None:
+    '''
+    Draws the engine lines below the engine icon, the area is cleared first so it can be redrawn as deeper lines come in
 
-        top_lines = result_container['top_lines']
-    
-    # Blit top lines below the engine icon
+    Args:
+        font (pygame.font.Font): The font of the panel header, the lines are spaced by its height
+    '''
     line_height = font.get_height() + PADDING // 2
     x = BOARD_WIDTH + PADDING * 2.5
     y = PADDING + engine_icon.get_height() + PADDING
-    font = pygame.font.Font(None, int(BOARD_HEIGHT * 1/23))  # changing font size to a lower value so that long lines fit in the screen
+    pygame.draw.rect(screen, ENGINE_PANEL_COLOR, pygame.Rect(BOARD_WIDTH + 2 * PADDING, y, SIDE_PANEL_WIDTH, BOARD_HEIGHT // 2 + PADDING - y))
+    font = get_font(BOARD_HEIGHT * 1/23)  # changing font size to a lower value so that long lines fit in the screen
     
     for line in top_lines:
-        eval_surface = font.render(line.eval, True, TEXT_COLOR)
+        eval_surface = render_text(font, line.eval, TEXT_COLOR)
         eval_width, eval_height = eval_surface.get_size()
         
         # Calculate the dimensions of the rectangle
@@ -322,141 +452,190 @@ def update_engine_panel(re_analyze: bool, font=pygame.font.Font(None, int(BOARD_
         screen.blit(eval_surface, (eval_rect.centerx - eval_width // 2, eval_rect.centery - eval_height // 2))
         
         # Render and blit the rest of the line
-        line_surface = font.render(line.get_single_string(), True, TEXT_COLOR)
+        line_surface = render_text(font, line.get_single_string(), TEXT_COLOR)
         screen.blit(line_surface, (x + engine_icon.get_width(), y))
         
         # Move y position for the next line
         y += line_height
     
-    pygame.display.update(pygame.Rect(BOARD_WIDTH + 2 * PADDING, PADDING, SIDE_PANEL_WIDTH, BOARD_HEIGHT // 2))
+    DIRTY_RECTS.append(pygame.Rect(BOARD_WIDTH + 2 * PADDING, PADDING, SIDE_PANEL_WIDTH, BOARD_HEIGHT // 2))
+
+def update_engine_panel(font=None) -> None:
+    '''Draws the engine panel with the lines found so far, or the loading screen if the engine hasn't finished a depth yet'''
+    if font is None:
+        font = get_font(BOARD_HEIGHT * 1/20)
+    pygame.draw.rect(screen, ENGINE_PANEL_COLOR, pygame.Rect(BOARD_WIDTH + 2 * PADDING, PADDING, SIDE_PANEL_WIDTH, BOARD_HEIGHT // 2))
+    global engine_icon; engine_icon = ICONS['engine']
+
+    screen.blit(engine_icon, (BOARD_WIDTH + PADDING * 2, PADDING))
     
-    # Call the callback to update the display
-    if callback:
-        callback()
-
-def start_update_engine_panel_thread(re_analyze: bool):
-    '''Start a thread to update the engine panel and update the display when done.'''
-    def callback():
-        update_display(pygame.Rect((BOARD_WIDTH + 2 * PADDING, PADDING, SIDE_PANEL_WIDTH, BOARD_HEIGHT // 2)), scrolling_size, update_now=True)
+    text_surface = render_text(font, "Stockfish 16.1", TEXT_COLOR)
+    icon_center_y = PADDING + engine_icon.get_height() // 2
+    text_y = icon_center_y - text_surface.get_height()
+    text_x = BOARD_WIDTH + PADDING * 2 + engine_icon.get_width() + PADDING
+    screen.blit(text_surface, (text_x, text_y))
+    screen.blit(render_text(font, f"Depth: {engine_depth}", TEXT_COLOR), (text_x, text_y + font.get_height() + PADDING // 2))
     
-    thread = threading.Thread(target=update_engine_panel, args=(re_analyze, pygame.font.Font(None, int(BOARD_HEIGHT * 1/20)), callback))
-    thread.start()
+    # Blit top lines below the engine icon
+    draw_top_lines(font)
+
+    if engine_future is not None and not top_lines:
+        display_loading_screen()
+
+def start_engine_analysis() -> None:
+    '''Starts analysing the current position on a separate thread, an analysis that is still running is stopped'''
+    global engine_future, analysis_stop, top_lines
+    stop_analysis(analysis_stop)
+    if engine_future is not None:
+        engine_future.cancel()   # only works if it is still waiting for the worker, then the engine never sees it
+    analysis_stop = threading.Event()
+    top_lines = []   # the lines of the last position are wrong for this one
+    engine_future = engine_executor.submit(run_get_top_lines, board.board_to_fen(), engine_depth, analysis_stop)
+    # the worker calls this when the analysis ends, or the main thread does at once if it was cancelled
+    engine_future.add_done_callback(lambda future, stop=analysis_stop: pygame.event.post(pygame.event.Event(ENGINE_DONE_EVENT, stop=stop)))
+    update_engine_panel()
+
+def handle_engine_event(event: pygame.event.Event) -> None:
+    '''
+    Draws the lines the analysis thread has sent for a new depth and notes the end of the analysis, the events of an
+    analysis that was replaced are ignored
 
-start_move_number = None
-def update_move_log(scrolling_size: float = 0, font=pygame.font.Font(None, int(BOARD_HEIGHT * 1/17))) -> None:
-    '''update the move log on the right side of the screen'''
-    pygame.draw.rect(screen, MOVE_LOG_COLOR, pygame.Rect(BOARD_WIDTH + 2 * PADDING, BOARD_HEIGHT // 2 + PADDING, SIDE_PANEL_WIDTH, BOARD_HEIGHT // 2))
+    Args:
+        event (pygame.event.Event): An ENGINE_LINES_EVENT or ENGINE_DONE_EVENT
+    '''
+    global engine_future, top_lines
+    if event.stop is not analysis_stop:
+        return
+    if event.type == ENGINE_LINES_EVENT:
+        top_lines = event.lines
+        draw_top_lines(get_font(BOARD_HEIGHT * 1/20))
+    else:
+        engine_future = None
+        if not top_lines:   # the analysis ended without lines so the loading box is removed
+            draw_top_lines(get_font(BOARD_HEIGHT * 1/20))
 
-    global start_move_number
-    if start_move_number is None:
-        start_move_number = board.fullmove_number
+def shutdown_engine() -> None:
+    '''Stops the analysis and waits for the analysis thread to finish before quitting the engine, so the engine is never quit under it'''
+    stop_analysis(analysis_stop)
+    engine_executor.shutdown(cancel_futures=True)
+    close_engine()
 
-    move_log_surface = pygame.Surface((SIDE_PANEL_WIDTH, BOARD_HEIGHT // 2))
-    move_log_surface.fill(MOVE_LOG_COLOR)
+start_move_number = None
+# every line of the move log is drawn once on this surface and the part that is scrolled to is copied to the screen,
+# only the lines with new moves are drawn again as the moves that were played before never change
+move_log_cache = None
+move_log_cache_key = None   # the sizes and colors the cache was drawn with
+rendered_move_count = 0
+last_rendered_move = None   # used to notice an undo or a new board, which both make the cache stale
+
+def draw_move_log_line(surface: pygame.Surface, line_index: int, font, line_height: float) -> None:
+    '''
+    Draws one line of the move log(a move number and the moves of white and black) on the move log surface
 
-    # Render move log
+    Args:
+        surface (pygame.Surface): The surface holding the whole move log
+        line_index (int): Which line to draw, each line is 2 moves
+        font (pygame.font.Font): The font of the moves
+        line_height (float): The height of a line including the spacing
+    '''
     move_log = board.move_log
-    y_offset = scrolling_size + PADDING // 2
-    line_height = font.get_height() + PADDING // 2
-
-    move_counter = start_move_number
     moves_per_line = 2
+    i = line_index * moves_per_line
+    y_offset = PADDING // 2 + line_index * line_height
+    surface.fill(MOVE_LOG_COLOR, pygame.Rect(0, y_offset, SIDE_PANEL_WIDTH, line_height))   # removing what was drawn here before
+
     x = PADDING
-    move_number_text = f"{move_counter}."
-    move_number_surface = font.render(move_number_text, True, (100, 100, 100) if LIGHT_THEME else (200, 200, 200))
-    move_number_width = move_number_surface.get_width()
-
-    for i in range(0, len(move_log), moves_per_line):
-        moves = move_log[i:i+moves_per_line]
-        x_coord = x + move_number_width + PADDING  # Set initial x coordinate for the move text
-        for idx, move in enumerate(moves, start=1):
-            move_text = f"{move}"
-            move_text_surface = font.render(move_text, True, (0, 255, 0) if i + idx >= len(move_log) else TEXT_COLOR)  # Green color for last move text
-
-            if idx == 1:
-                # Blit move number only for the first move of each line
-                move_log_surface.blit(move_number_surface, (x, y_offset + (line_height - move_number_surface.get_height()) // 2))
-                move_counter += 1  # Increment move number per line
-                move_number_text = f"{move_counter}."
-                move_number_surface = font.render(move_number_text, True, (100, 100, 100) if LIGHT_THEME else (200, 200, 200))
-                move_number_width = move_number_surface.get_width()
-            else:
-                # Set x coordinate for the second move
-                x_coord = SIDE_PANEL_WIDTH // 2.5
+    move_number_surface = render_text(font, f"{start_move_number + line_index}.", (100, 100, 100) if LIGHT_THEME else (200, 200, 200))
+    x_coord = x + move_number_surface.get_width() + PADDING  # Set initial x coordinate for the move text
+    for idx, move in enumerate(move_log[i:i+moves_per_line], start=1):
+        move_text = f"{move}"
+        move_text_surface = render_text(font, move_text, (0, 255, 0) if i + idx >= len(move_log) else TEXT_COLOR)  # Green color for last move text
+
+        if idx == 1:
+            # Blit move number only for the first move of each line
+            surface.blit(move_number_surface, (x, y_offset + (line_height - move_number_surface.get_height()) // 2))
+        else:
+            # Set x coordinate for the second move
+            x_coord = SIDE_PANEL_WIDTH // 2.5
 
-            # Calculate dimensions for transparent rectangle
-            rect_width = move_text_surface.get_width() + PADDING  # Adjust width to fit the text
-            rect_height = move_text_surface.get_height() + PADDING // 50  # Adjust height to fit the text
-            rect_x = x_coord  # Center the rectangle horizontally
-            rect_y = y_offset + (line_height - rect_height) // 2  # Center the rectangle vertically
+        # Calculate dimensions for transparent rectangle
+        rect_width = move_text_surface.get_width() + PADDING  # Adjust width to fit the text
+        rect_height = move_text_surface.get_height() + PADDING // 50  # Adjust height to fit the text
+        rect_x = x_coord  # Center the rectangle horizontally
+        rect_y = y_offset + (line_height - rect_height) // 2  # Center the rectangle vertically
 
-            # Draw transparent rectangle over move text
-            pygame.draw.rect(move_log_surface, ((170, 170, 170, 150) if LIGHT_THEME else (60, 60, 60, 150)), pygame.Rect(rect_x, rect_y, rect_width, rect_height), border_radius=5)
+        # Draw transparent rectangle over move text
+        pygame.draw.rect(surface, ((170, 170, 170, 150) if LIGHT_THEME else (60, 60, 60, 150)), pygame.Rect(rect_x, rect_y, rect_width, rect_height), border_radius=5)
 
-            # Blit move text
-            move_log_surface.blit(move_text_surface, (x_coord + PADDING // 2, y_offset + PADDING // 4))
+        # Blit move text
+        surface.blit(move_text_surface, (x_coord + PADDING // 2, y_offset + PADDING // 4))
 
-            # Adjust x for the next move
-            x += move_number_width + move_text_surface.get_width() + PADDING * 2  # Adjust for spacing between move number and move text
+def update_move_log(scrolling_size: float = 0, font=None) -> None:
+    '''update the move log on the right side of the screen'''
+    global start_move_number, move_log_cache, move_log_cache_key, rendered_move_count, last_rendered_move
+    if font is None:
+        font = get_font(BOARD_HEIGHT * 1/17)
+    pygame.draw.rect(screen, MOVE_LOG_COLOR, pygame.Rect(BOARD_WIDTH + 2 * PADDING, BOARD_HEIGHT // 2 + PADDING, SIDE_PANEL_WIDTH, BOARD_HEIGHT // 2))
 
-        y_offset += line_height  # Move to the next line
-        x = PADDING  # Reset x coordinate for the next line
+    if start_move_number is None:
+        start_move_number = board.fullmove_number
 
-    screen.blit(move_log_surface, (BOARD_WIDTH + 2 * PADDING, BOARD_HEIGHT // 2 + PADDING))
+    move_log = board.move_log
+    line_height = font.get_height() + PADDING // 2
+    number_of_lines = (len(move_log) + 1) // 2
+
+    key = (font, LIGHT_THEME, SIDE_PANEL_WIDTH, BOARD_HEIGHT, start_move_number)
+    stale = rendered_move_count > len(move_log) or (rendered_move_count and move_log[rendered_move_count - 1] is not last_rendered_move)
+    if key != move_log_cache_key or stale or PADDING // 2 + number_of_lines * line_height > move_log_cache.get_height():
+        # the cache is made with room for twice the lines so it isn't remade for every new line
+        height = max(BOARD_HEIGHT // 2, PADDING // 2 + max(number_of_lines * 2, 32) * line_height)
+        move_log_cache = pygame.Surface((SIDE_PANEL_WIDTH, height))
+        move_log_cache.fill(MOVE_LOG_COLOR)
+        move_log_cache_key = key
+        rendered_move_count = 0
+
+    # the line of the last drawn move is drawn again as that move is no longer the green last move
+    if rendered_move_count != len(move_log):
+        for line_index in range(max(rendered_move_count - 1, 0) // 2, number_of_lines):
+            draw_move_log_line(move_log_cache, line_index, font, line_height)
+    rendered_move_count = len(move_log)
+    last_rendered_move = move_log[-1] if move_log else None
+
+    screen.blit(move_log_cache, (BOARD_WIDTH + 2 * PADDING, BOARD_HEIGHT // 2 + PADDING), pygame.Rect(0, -scrolling_size, SIDE_PANEL_WIDTH, BOARD_HEIGHT // 2))
 
     draw_buttons()
 
 def draw_buttons() -> None:
     '''will draw the four buttons on the right side of the screen for copy, paste, flip and light theme'''
-    # drawing buttons
-    button_positions = [(window_width - PADDING * 4, BOARD_HEIGHT // 2 + PADDING),
-                        (window_width - PADDING * 4, BOARD_HEIGHT // 2 + PADDING * 5),
-                        (window_width - PADDING * 4, BOARD_HEIGHT // 2 + PADDING * 9),
-                        (window_width - PADDING * 4, BOARD_HEIGHT // 2 + PADDING * 13)]
-    button_images = ['assets\images\copy_icon.png', 'assets\images\paste_icon.png', 'assets/images/flip_icon.png', 'assets\images\light_icon.png']
-
-    for position, image_path in zip(button_positions, button_images):
-        button_image = pygame.transform.smoothscale(pygame.image.load(resource_path(os.path.join(image_path))), (PADDING * 3, PADDING * 3))
-        screen.blit(button_image, position)
+    screen.blits([(ICONS[icon], rect) for icon, rect in BUTTON_RECTS], doreturn=False)
 
 def handle_scrolling(event, scrolling_size):
     '''a function to handle scrolling of the move log using the mouse wheel'''
     if event is None:
-        start_time = time.time()
-        # this will recursively scan an imaginary line at the bottom for a green pixel which indigates the last move
-        # if its not found it will move down and update the move log thus increasing the scrolling size until the last move is found
-        # i know there are better and more efficient methods but i was stuck, so this is what you get
-        pixel_found = False
-        while len(board.move_log) > 18 and not pixel_found:    
-            for pixel in range(int(BOARD_WIDTH + PADDING * 2), int(BOARD_WIDTH + PADDING * 2 + SIDE_PANEL_WIDTH)):
-                pixel_color = screen.get_at((pixel, int((window_height - PADDING * 5) // 1)))
-                if pixel_color == (0,255, 0):
-                    pixel_found = True
-                    break
-            scrolling_size -= 5
-            update_move_log(scrolling_size)
-            pygame.display.update(pygame.Rect(BOARD_WIDTH + PADDING * 2, BOARD_HEIGHT // 2 + PADDING, SIDE_PANEL_WIDTH, BOARD_HEIGHT // 2))
-            if time.time() - start_time >= 5:
-                # incase it somehow skips the green part
-                scrolling_size = 0
-                break
+        # scrolls down just far enough for the line with the last move to be above the bottom of the move log, the lines have
+        # a fixed height so this is worked out directly instead of scrolling step by step and looking for the green last move
+        line_height = get_font(BOARD_HEIGHT * 1/17).get_height() + PADDING // 2   # same font and spacing as update_move_log
+        number_of_lines = (len(board.move_log) + 1) // 2
+        scrolling_size = min(0, (BOARD_HEIGHT // 2 - PADDING * 4) - (PADDING // 2 + number_of_lines * line_height))
 
     elif event.type == pygame.MOUSEWHEEL:
         scrolling_size += event.y * 10  # Adjust the scrolling speed as needed
         # Calculate the maximum scroll size based on the total height of the text in the move log
-        total_text_height = len(board.move_log) * pygame.font.Font(None, int(PADDING * 1.5)).get_height()
+        total_text_height = len(board.move_log) * get_font(PADDING * 1.5).get_height()
         max_scroll = max(0, total_text_height - (BOARD_HEIGHT // 2) + PADDING)
         # Ensure the scrolling size stays within the valid range
         scrolling_size = max(-max_scroll, min(0, scrolling_size))
 
     return scrolling_size
 
-def draw_coordinates(pov: bool, font=pygame.font.Font(None, int(BOARD_HEIGHT * 1/20))) -> None:
+def draw_coordinates(pov: bool, font=None) -> None:
+    if font is None:
+        font = get_font(BOARD_HEIGHT * 1/20)
     # Draw horizontal coordinates (a-h) slightly below the squares
     coordinate_labels = 'hgfedcba' if not pov else 'abcdefgh'
     for i in range(8):
         # Draw horizontal coordinates (a-h) slightly below the squares
-        text_surface = font.render(coordinate_labels[i], True, TEXT_COLOR)  # White color
+        text_surface = render_text(font, coordinate_labels[i], TEXT_COLOR)  # White color
         text_rect = text_surface.get_rect(center=(i * SQUARE_SIZE + SQUARE_SIZE // 2 + PADDING, SQUARE_SIZE * 8 + PADDING * 3/2))
         screen.blit(text_surface, text_rect)
 
@@ -464,28 +643,27 @@ def draw_coordinates(pov: bool, font=pygame.font.Font(None, int(BOARD_HEIGHT * 1
     coordinate_labels = '12345678' if not pov else '87654321'
     for i in range(8):
         # Draw vertical coordinates (1-8) on the left side
-        text_surface = font.render(coordinate_labels[i], True, TEXT_COLOR)  # White color
+        text_surface = render_text(font, coordinate_labels[i], TEXT_COLOR)  # White color
         text_rect = text_surface.get_rect(center=(PADDING // 2, i * SQUARE_SIZE + SQUARE_SIZE // 2 + PADDING))
         screen.blit(text_surface, text_rect)
 
-def draw_pieces(board: list, pov: bool) -> None:
+def draw_pieces(squares: bytearray, pov: bool) -> None:
     '''
-    Draw the pieces on the board using the current board position array
+    Draw the pieces on the board using the squares of the board class, they are read directly instead of
+    through board_array which builds a new 2d list on every access
 
     Args:
-        board (list): A array from the board class
+        squares (bytearray): The piece id on each square, board.squares
         pov (Bool): The board perspective(white or black)
-        size(int): The desired size for the pieces
     '''
-    for row in range(8):
-        for column in range(8):
-            piece = board[row][column]
-            if piece != '--':
-                if pov:
-                    screen.blit(IMAGES[piece], pygame.Rect(column * SQUARE_SIZE + PADDING + SQ_PIECE_DIFFERENCE, row * SQUARE_SIZE + PADDING + SQ_PIECE_DIFFERENCE, PIECE_SIZE, PIECE_SIZE))
-                else:
-                    # When pov is False, adjust the row and column indices to reflect the black perspective
-                    screen.blit(IMAGES[piece], pygame.Rect((7 - column) * SQUARE_SIZE + PADDING + SQ_PIECE_DIFFERENCE, (7 - row) * SQUARE_SIZE + PADDING + SQ_PIECE_DIFFERENCE, PIECE_SIZE, PIECE_SIZE))
+    # all pieces are collected first and drawn with a single call instead of one blit call per piece
+    positions = PIECE_POSITIONS[pov]   # the table takes care of flipping the board for the black perspective
+    blit_sequence = [(IMAGES[PIECES[piece_id]], positions[square]) for square, piece_id in enumerate(squares) if piece_id]
+    # fblits skips the per item checks of blits but only pygame-ce has it
+    if hasattr(screen, 'fblits'):
+        screen.fblits(blit_sequence)
+    else:
+        screen.blits(blit_sequence, doreturn=False)
 
 def highlight_squares(pov: bool, coord: tuple = None) -> None:
     '''
@@ -496,38 +674,61 @@ def highlight_squares(pov: bool, coord: tuple = None) -> None:
         pov (Bool): The board perspective(white or black)
     '''
     if coord is not None:
-        transparent_square = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-        transparent_square.fill((20, 20, 20, 140))  # Fill with semi-transparent color
+        move_square = transparent_square(SQUARE_SIZE, (20, 20, 20, 140))
+        capture_square = transparent_square(SQUARE_SIZE, (255, 0, 0, 140))  # Red for captures
+        highlights = []
+        captured_pieces = []   # only the pieces under the highlights are drawn again instead of the whole board
+        highlighted = 0   # one bit per square, the four promotions to a square would otherwise draw its transparent square four times
         for move in board.legal_moves:
-            end_row, end_col = (move.end_row, move.end_col) if pov else (7 - move.end_row, 7 - move.end_col)
-
-            if move.start_row == coord[0] and move.start_col == coord[1]:
-                if move.piece_captured != '--' or (end_row, end_col) == board.en_passant_square:
-                    transparent_square.fill((255, 0, 0, 140))  # Red for captures
+            if move.start_row == coord[0] and move.start_col == coord[1] and not highlighted >> move.end_square & 1:
+                highlighted |= 1 << move.end_square
+                end_position = SQUARE_POSITIONS[pov][move.end_square]
+                if move.piece_captured != '--':
+                    highlights.append((capture_square, end_position))
+                    captured_pieces.append((IMAGES[move.piece_captured], PIECE_POSITIONS[pov][move.end_square]))
+                elif (move.end_row, move.end_col) == board.en_passant_square:
+                    highlights.append((capture_square, end_position))
                 else:
-                    transparent_square.fill((20, 20, 20, 140))
-                    
-                end_x = end_col * SQUARE_SIZE + PADDING
-                end_y = end_row * SQUARE_SIZE + PADDING
-                screen.blit(transparent_square, (end_x, end_y))
-    draw_pieces(board.board_array, pov)    # drawing the pieces again to avoid the transparent squares to overlap the pieces
-        
+                    highlights.append((move_square, end_position))
+
+        screen.blits(highlights, doreturn=False)
+        # drawing the captured pieces again to avoid the transparent squares to overlap the pieces
+        screen.blits(captured_pieces, doreturn=False)
+
+@functools.lru_cache(maxsize=4)
+def check_fade_colors(square_color: tuple, highlight_color: tuple = (255, 50, 50), cycles: int = 20) -> tuple:
+    '''
+    Works out the colors the king square fades through when the king is in check, the king can only stand on a light or
+    a dark square so each gradient is only worked out once
+
+    Args:
+        square_color (tuple): The color of the king square, the fade ends here
+        highlight_color (tuple): The color the fade starts from
+        cycles (int): The number of steps of the fade
+
+    Returns:
+        tuple: The colors of each step
+    '''
+    color_diff = (square_color[0] - highlight_color[0], square_color[1] - highlight_color[1], square_color[2] - highlight_color[2])
+    return tuple((highlight_color[0] + color_diff[0] * i // cycles, highlight_color[1] + color_diff[1] * i // cycles, highlight_color[2] + color_diff[2] * i // cycles)
+                 for i in range(cycles))
+
 def highlight_checks(pov: bool):
     '''This function will highlight the king square if the king is in check and make the square color fade over time.'''
     update_display(pygame.Rect(0, 0, BOARD_WIDTH + PADDING * 2, BOARD_HEIGHT + PADDING * 2), scrolling_size)
-    king_square = board.white_king_pos if board.white_to_move else board.black_king_pos 
-    king_square = king_square if pov else (7 - king_square[0], 7 - king_square[1])
+    king_row, king_col = board.white_king_pos if board.white_to_move else board.black_king_pos
 
     if board.in_check():
-        highlight_color = (255, 50, 50)
-        square_color = LIGHT_SQ if (king_square[0] + king_square[1]) % 2 == 0 else DARK_SQ
-        color_diff = (square_color[0] - highlight_color[0], square_color[1] - highlight_color[1], square_color[2] - highlight_color[2])
-        cycles = 20
-        for i in range(cycles):
-            highlight_color_i = (highlight_color[0] + color_diff[0] * i // cycles, highlight_color[1] + color_diff[1] * i // cycles, highlight_color[2] + color_diff[2] * i // cycles)
-            pygame.draw.rect(screen, highlight_color_i, pygame.Rect(king_square[1] * SQUARE_SIZE + PADDING, king_square[0] * SQUARE_SIZE + PADDING, SQUARE_SIZE, SQUARE_SIZE))
-            draw_pieces(board.board_array, pov)
-            pygame.display.flip()
+        square_color = LIGHT_SQ if (king_row + king_col) % 2 == 0 else DARK_SQ   # flipping the board keeps the colors of the squares
+        fade_colors = check_fade_colors(square_color)
+        # only the king square changes while fading so only it is redrawn and sent to the display
+        king_rect = pygame.Rect(SQUARE_POSITIONS[pov][king_row * 8 + king_col], (SQUARE_SIZE, SQUARE_SIZE))
+        king_image = IMAGES[board.piece_at(king_row, king_col)]
+        king_position = PIECE_POSITIONS[pov][king_row * 8 + king_col]
+        for highlight_color_i in fade_colors:
+            pygame.draw.rect(screen, highlight_color_i, king_rect)
+            screen.blit(king_image, king_position)
+            pygame.display.update(king_rect)
             pygame.time.delay(15)
 
 def get_promoted_piece(row: int, col: int, color: str, pov: bool) -> str:
@@ -549,20 +750,9 @@ def get_promoted_piece(row: int, col: int, color: str, pov: bool) -> str:
     background_color = (190, 190, 190)
 
     # Adjust menu position based on perspective and color
-    if pov:
-        if color == 'w':
-            menu_x = col * SQUARE_SIZE + PADDING
-            menu_y = row * SQUARE_SIZE + PADDING
-        else:
-            menu_x = col * SQUARE_SIZE + PADDING
-            menu_y = row*SQUARE_SIZE - 3*SQUARE_SIZE + PADDING
-    else:
-        if color == 'w':
-            menu_x = (7-col) * SQUARE_SIZE + PADDING
-            menu_y = (7-row) * SQUARE_SIZE - 3*SQUARE_SIZE + PADDING
-        else:
-            menu_x = (7-col) * SQUARE_SIZE + PADDING
-            menu_y = (7-row) * SQUARE_SIZE + PADDING
+    menu_x, menu_y = SQUARE_POSITIONS[pov][row * 8 + col]
+    if (color == 'w') != pov:   # the promotion square is at the bottom of the screen so the menu opens upwards
+        menu_y -= 3 * SQUARE_SIZE
 
     # Define the order of promotion pieces based on the color and perspective
     promotion_order = {
@@ -571,21 +761,25 @@ def get_promoted_piece(row: int, col: int, color: str, pov: bool) -> str:
     }
 
     # Draw the background of the promotion menu
-    pygame.draw.rect(screen, background_color, (menu_x, menu_y, promotion_menu_width, promotion_menu_height))
+    menu_rect = pygame.Rect(menu_x, menu_y, promotion_menu_width, promotion_menu_height)
+    pygame.draw.rect(screen, background_color, menu_rect)
 
-    # Draw the promotion menu by blitting the images of the promotion pieces
-    for i, piece in enumerate(promotion_order[color]):
-        piece_image = IMAGES[piece]
-        piece_y = menu_y + i * (promotion_menu_height // len(promotion_order[color]))
-        screen.blit(piece_image, (menu_x + SQ_PIECE_DIFFERENCE, piece_y + SQ_PIECE_DIFFERENCE))
+    # Draw the promotion menu by blitting the images of the promotion pieces, all in one call like draw_pieces
+    piece_height = promotion_menu_height // len(promotion_order[color])
+    screen.blits([(IMAGES[piece], (menu_x + SQ_PIECE_DIFFERENCE, menu_y + i * piece_height + SQ_PIECE_DIFFERENCE))
+                  for i, piece in enumerate(promotion_order[color])], doreturn=False)
 
-    pygame.display.flip()
+    pygame.display.update(menu_rect)   # updated at once as the main loop is paused until a piece is picked
 
     # Wait for the player to click on a promotion piece
     while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                shutdown_engine()
                 pygame.quit()
+                sys.exit()
+            elif event.type == ENGINE_LINES_EVENT or event.type == ENGINE_DONE_EVENT:
+                handle_engine_event(event)   # the lines are shown with the next frame of the main loop
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 click_x, click_y = pygame.mouse.get_pos()
                 # Check if the click is within the promotion menu bounds
@@ -604,8 +798,9 @@ def play_sound(move: Move) -> None:
         move (Move): The current move that is supposed to be made
     '''
     # game end sound will be outside this function
-    if move in board.legal_moves:
-        if move.is_check:
+    legal_move = board.find_legal_move(move)   # the legal move knows if it is castling
+    if legal_move is not None:
+        if board.gives_check(legal_move):
             SOUNDS['check'].play()
         elif move.piece_captured != '--' or (move.end_row, move.end_col) == board.en_passant_square:
             SOUNDS['capture'].play()
@@ -618,6 +813,66 @@ def play_sound(move: Move) -> None:
     else:
         SOUNDS['illegal'].play()
 
+def make_move_from_clicks(clicks: list) -> bool:
+    '''
+    Makes the move chosen with two clicks or a drag, asking for the promotion piece first when a pawn reaches
+    the last row, then plays its sounds, scrolls the move log, draws the position and analyses it if it was legal
+
+    Args:
+        clicks (list): The start row and column followed by the destination row and column
+
+    Returns:
+        bool: True if the move was legal and was made
+    '''
+    global scrolling_size
+    move = Move(board, clicks)
+    if ((move.end_row == 0  or move.end_row == 7) and move.piece_moved[1] == 'p'   # if we have a case of promotion
+        and move.start_row == (1 if move.piece_moved[0] == 'w' else 6)):   # and the move pawn was only one square away from promotion(to avoid popping up of menu when not needed)
+        promoted_piece = get_promoted_piece(move.end_row, move.end_col, move.piece_moved[0], pov)
+        move = Move(board, clicks, promoted_piece=promoted_piece)   # the uci of the move depends on the promoted piece
+
+    play_sound(move)   # this should come before actually making the move
+    # checked before making the move so the new position is only analysed after a legal move changed the fen
+    is_legal = move.uci in board.legal_moves_by_uci
+    board.make_legal_move(move)
+
+    if board.is_checkmate or board.is_draw:
+        SOUNDS['end'].play()
+
+    scrolling_size = handle_scrolling(None, scrolling_size)
+    highlight_checks(pov)
+    if is_legal:
+        # highlight_checks only shows the board, the move log of the side panel is shown here as the release of a
+        # click that ends the game is not handled
+        DIRTY_RECTS.append(pygame.Rect(BOARD_WIDTH + PADDING, 0, SIDE_PANEL_WIDTH + PADDING * 2, BOARD_HEIGHT + PADDING))
+        start_engine_analysis()
+    return is_legal
+
+def coalesce_events(events: list) -> list:
+    '''
+    Merges the runs of events that the main loop would handle one after the other in the same way. The main loop reads
+    the position of the mouse itself so only the last motion of a run of mouse motions is kept, and a run of wheel
+    events becomes one event with the scrolls added up so the move log is drawn or the analysis restarted only once
+
+    Args:
+        events (list): The events taken from the queue
+
+    Returns:
+        list: The events with the runs merged
+    '''
+    coalesced = []
+    for event in events:
+        if coalesced and coalesced[-1].type == event.type:
+            if event.type == pygame.MOUSEMOTION:
+                coalesced[-1] = event
+                continue
+            if event.type == pygame.MOUSEWHEEL:
+                previous = coalesced[-1]
+                coalesced[-1] = pygame.event.Event(pygame.MOUSEWHEEL, {**event.dict, 'x': previous.x + event.x, 'y': previous.y + event.y})
+                continue
+        coalesced.append(event)
+    return coalesced
+
 def update_display(update_rect: pygame.Rect, scrolling_size, selected_piece_coordinates: tuple = None, update_now: bool = True) -> None:
     """
     Updates the display by drawing the chessboard, pieces, move log, engine panel, and highlighting squares.
@@ -633,14 +888,14 @@ def update_display(update_rect: pygame.Rect, scrolling_size, selected_piece_coor
     """        
     color_board(pov)
     highlight_squares(pov, selected_piece_coordinates)
-    draw_pieces(board.board_array, pov)
+    draw_pieces(board.squares, pov)
     update_move_log(scrolling_size)
-    update_engine_panel(False)
+    update_engine_panel()
 
     if board.is_checkmate:   # highlinghting the checkmated king sqaure red permenently
-        king_square = board.white_king_pos if board.white_to_move else board.black_king_pos if pov else (7 - board.white_king_pos[0], 7 - board.white_king_pos[1])
-        pygame.draw.rect(screen, (180, 40, 30), pygame.Rect(king_square[1] * SQUARE_SIZE + PADDING, king_square[0] * SQUARE_SIZE + PADDING, SQUARE_SIZE, SQUARE_SIZE))
-        draw_pieces(board.board_array, pov)
+        king_row, king_col = board.white_king_pos if board.white_to_move else board.black_king_pos
+        pygame.draw.rect(screen, (180, 40, 30), pygame.Rect(SQUARE_POSITIONS[pov][king_row * 8 + king_col], (SQUARE_SIZE, SQUARE_SIZE)))
+        screen.blit(IMAGES[board.piece_at(king_row, king_col)], PIECE_POSITIONS[pov][king_row * 8 + king_col])
         
     if update_now:
         if update_rect is not None:
@@ -657,163 +912,131 @@ def main() -> None:
     global screen, BOARD_WIDTH, BOARD_HEIGHT, SIDE_PANEL_WIDTH, PADDING, SQUARE_SIZE, PIECE_SIZE, PADDING_COLOR, LIGHT_THEME, SQ_PIECE_DIFFERENCE,\
         MOVE_LOG_COLOR, ENGINE_PANEL_COLOR, TEXT_COLOR, LIGHT_SQ, DARK_SQ, window_height, window_width, pov, board, engine_depth
     # to see if we are moving a piece or tapping the menu
-    in_board = lambda: PADDING < pygame.mouse.get_pos()[0] < BOARD_WIDTH + PADDING and \
-            PADDING < pygame.mouse.get_pos()[1] < BOARD_HEIGHT + PADDING 
+    in_board = lambda mx, my: PADDING < mx < BOARD_WIDTH + PADDING and PADDING < my < BOARD_HEIGHT + PADDING
     
     load_images()
+    load_icons()
+    rebuild_ui_rects()
+    load_square_positions()
     load_sounds()
     
     # tp pass into update_display to update only selectivea areas for optimization
     board_rect = pygame.Rect(0, 0, BOARD_WIDTH + PADDING, BOARD_HEIGHT + PADDING)
-    side_panel_rect = pygame.Rect(BOARD_WIDTH + PADDING, 0, SIDE_PANEL_WIDTH + PADDING * 2, BOARD_HEIGHT + PADDING)
     
     global scrolling_size; scrolling_size = 0
     clicks = []  # The first 2 indexes will store the start click and the second 2 will have the destination click
     dragging = False
+    drag_background = None   # the board as it is under the dragged piece, taken on the first frame of each drag
+    dragged_piece_rect = None
+    drag_moved = False   # set by the events that move the dragged piece, it is drawn once per frame
     selected_piece = None   # will store the coordinates of the selected piece
-    last_move_is_legal = True   # a flag to make sure that the last move was legal so that we can re analayze the position after making the move
+    position_drawn = False   # set when highlight_checks has drawn the position after a move, so the mouse release doesn't draw it again
+    shown_tooltip = None   # the (text, position) of the tooltip on the screen, None when there is none
+    shown_tooltip_rect = None   # the area of that tooltip
 
     update_display(None, scrolling_size)
-    start_update_engine_panel_thread(re_analyze=True)
+    start_engine_analysis()
     running = True
     while running:
-        for event in pygame.event.get():
+        events = coalesce_events(pygame.event.get())
+        for event in events:
+            mx, my = pygame.mouse.get_pos()   # read once per event, every check below uses it
             if event.type == pygame.QUIT:
+                shutdown_engine()
                 pygame.quit()
                 sys.exit()
 
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and not dragging:
                 
-                if in_board() and not (board.is_checkmate or board.is_draw):   # piece moves
-                    row, col = coordinates_converter(pygame.mouse.get_pos(), pov, SQUARE_SIZE, PADDING)
+                if in_board(mx, my) and not (board.is_checkmate or board.is_draw):   # piece moves
+                    position_drawn = False
+                    row, col = coordinates_converter((mx, my), pov, SQUARE_SIZE, PADDING)
                     selected_piece = (row, col)
                     # first click and the clicked square is not empty and is not an opponent piece
-                    if len(clicks) == 0 and board.board_array[row][col] != '--' and board.board_array[row][col][0] == ('w' if board.white_to_move else 'b'):
+                    if len(clicks) == 0 and board.piece_at(row, col) != '--' and board.piece_at(row, col)[0] == ('w' if board.white_to_move else 'b'):
                         clicks.extend([row, col])
                         dragging = True
+                        drag_background = None
                         highlight_squares(pov, selected_piece)
-                        pygame.display.flip()
+                        DIRTY_RECTS.append(board_rect)
 
                     elif len(clicks) == 2 and [row, col] != clicks:   # the two click move making method
                         dragging = False
                         selected_piece = None
                         clicks.extend([row, col])
-
-                        move = Move(board, clicks)
-                        if ((move.end_row == 0  or move.end_row == 7) and board.board_array[move.start_row][move.start_col][1] == 'p'   # if we have a case of promotion
-                            and move.start_row == (1 if move.piece_moved[0] == 'w' else 6)):   # and the move pawn was only one square away from promotion(to avoid popping up of menu when not needed)
-                            promoted_piece = get_promoted_piece(move.end_row, move.end_col, board.board_array[move.start_row][move.start_col][0], pov)
-                            move = Move(board, clicks, promoted_piece=promoted_piece)
-
-                        play_sound(move)   # this should come before actually making the move
-                            
-                        if move in board.legal_moves:
-                            last_move_is_legal = True   # this structure of flagging and then reanalyzing is necessary to make sure that the fen has changed after making the move so that we are analyzing the new position
-                            
-                        board.make_legal_move(move)
-
-                        if board.is_checkmate or board.is_draw:
-                            SOUNDS['end'].play()
-                        
+                        make_move_from_clicks(clicks)
+                        position_drawn = True   # highlight_checks drew the position after the move
                         clicks.clear()   # to maintain indexing for the next 2 clicks
-                        scrolling_size = handle_scrolling(None, scrolling_size)
-                        highlight_checks(pov)
-                        if last_move_is_legal:
-                            start_update_engine_panel_thread(re_analyze=True)
-                    
-                    last_move_is_legal = False
 
                 else:   # button clicks
-                    mouse_pos = pygame.mouse.get_pos()
-                    if window_width - PADDING * 4 <= mouse_pos[0] <= window_width - PADDING:
-                        y = mouse_pos[1] - BOARD_HEIGHT // 2
-                        if PADDING <= y <= PADDING * 4:
-                            # copy fen
-                            pyperclip.copy(board.board_to_fen())
-                            display_message(screen, "FEN copied to clipboard!", (0, 255, 0))
-                        elif PADDING * 5 <= y <= PADDING * 9:
-                            # paste fen
-                            try:
-                                board = Board(pyperclip.paste())
-                                display_message(screen, "FEN changed successfully!", (0, 255, 0))
-                            except:
-                                display_message(screen, "Invalid FEN! Please try again.", (255, 0, 0))
-                        elif PADDING * 10 <= y <= PADDING * 13:
-                            pov = not pov   # flip perspective
-                            update_display(side_panel_rect, scrolling_size, selected_piece)
-                        elif PADDING * 14 <= y <= PADDING * 17:
-                            LIGHT_THEME = not LIGHT_THEME    # change  theme
-                            PADDING_COLOR = (150, 150, 150) if LIGHT_THEME else (0, 0, 0)
-                            MOVE_LOG_COLOR = (200, 200, 200) if LIGHT_THEME else (40, 40, 40)
-                            ENGINE_PANEL_COLOR = (255, 255, 255) if LIGHT_THEME else (70, 70, 70)
-                            TEXT_COLOR = (0, 0, 0) if LIGHT_THEME else (255, 255, 255)
-                            update_display(side_panel_rect, scrolling_size, selected_piece) 
+                    button = next((icon for icon, rect in BUTTON_RECTS if rect.collidepoint(mx, my)), None)
+                    if button == 'copy':
+                        # copy fen
+                        pyperclip.copy(board.board_to_fen())
+                        display_message(screen, "FEN copied to clipboard!", (0, 255, 0))
+                        update_display(None, scrolling_size, selected_piece)   # to remove the message
+                    elif button == 'paste':
+                        # paste fen
+                        try:
+                            board = Board(pyperclip.paste())
+                            display_message(screen, "FEN changed successfully!", (0, 255, 0))
+                        except:
+                            display_message(screen, "Invalid FEN! Please try again.", (255, 0, 0))
+                        update_display(None, scrolling_size, selected_piece)   # to remove the message and show the new board
+                    elif button == 'flip':
+                        pov = not pov   # flip perspective
+                        update_display(None, scrolling_size, selected_piece)
+                    elif button == 'light':
+                        LIGHT_THEME = not LIGHT_THEME    # change  theme
+                        PADDING_COLOR = (150, 150, 150) if LIGHT_THEME else (0, 0, 0)
+                        MOVE_LOG_COLOR = (200, 200, 200) if LIGHT_THEME else (40, 40, 40)
+                        ENGINE_PANEL_COLOR = (255, 255, 255) if LIGHT_THEME else (70, 70, 70)
+                        TEXT_COLOR = (0, 0, 0) if LIGHT_THEME else (255, 255, 255)
+                        update_display(None, scrolling_size, selected_piece)
                         
             elif event.type == pygame.MOUSEBUTTONUP and event.button == 1 and not (board.is_checkmate or board.is_draw):   # replaces second click when the user is dragging
                 dragging = False
-                row, col = coordinates_converter(pygame.mouse.get_pos(), pov, SQUARE_SIZE, PADDING)
+                row, col = coordinates_converter((mx, my), pov, SQUARE_SIZE, PADDING)
                 if len(clicks) == 2 and clicks != [row, col]:   # only execute of the player tries to drag
                     clicks.extend([row, col])
                     selected_piece = None
+                    make_move_from_clicks(clicks)
+                    position_drawn = True
+                    clicks.clear()   # to maintain indexing for the next 2 clicks
 
-                    move = Move(board, clicks)
-                    if ((move.end_row == 0  or move.end_row == 7) and board.board_array[move.start_row][move.start_col][1] == 'p'   # if we have a case of promotion
-                        and move.start_row == (1 if move.piece_moved[0] == 'w' else 6)):   # and the move pawn was only one square away from promotion(to avoid popping up of menu when not needed)
-                        promoted_piece = get_promoted_piece(move.end_row, move.end_col, board.board_array[move.start_row][move.start_col][0], pov)
-                        move = Move(board, clicks, promoted_piece=promoted_piece)
+                # after a move the whole position is already drawn and shown by make_move_from_clicks, picking up a
+                # piece and putting it back only changes the board, this also removes a dragged piece
+                if not position_drawn:
+                    update_display(board_rect, scrolling_size, selected_piece)
+                position_drawn = False
 
-                    play_sound(move)
-                    
-                    if move in board.legal_moves:
-                        last_move_is_legal = True
-                        
-                    board.make_legal_move(move)
-                    
-                    if board.is_checkmate or board.is_draw:
-                        SOUNDS['end'].play()
+            elif (event.type == pygame.MOUSEMOTION or pygame.mouse.get_pressed()[0]) and dragging and in_board(mx, my) and not (board.is_checkmate or board.is_draw) and len(clicks) == 2:   # dragging animation, the conditions are very important
+                drag_moved = True   # the piece is drawn once after all the events of the frame, at the latest position of the mouse
 
-                    clicks.clear()   # to maintain indexing for the next 2 clicks
-                    scrolling_size = handle_scrolling(None, scrolling_size)
-                    highlight_checks(pov)
-                    if last_move_is_legal:
-                        start_update_engine_panel_thread(re_analyze=True)
-                    
-                last_move_is_legal = False                
-                update_display(None, scrolling_size, selected_piece)   # to update the display when we make a move or leave a dragging piece
-
-            elif (event.type == pygame.MOUSEMOTION or pygame.mouse.get_pressed()[0]) and dragging and in_board() and not (board.is_checkmate or board.is_draw) and len(clicks) == 2:   # dragging animation, the conditions are very important
-                piece = board.board_array[clicks[0]][clicks[1]]   # taking the moved piece
-                # redrawing the board to remove the piece from the previous square
-                update_display(board_rect, scrolling_size, selected_piece, update_now=False)
-                # redrawing the square underneath the piece
-                pygame.draw.rect(screen, LIGHT_SQ if clicks[0] % 2 == clicks[1] % 2 else DARK_SQ, pygame.Rect((clicks[1] if pov else 7 - clicks[1]) * SQUARE_SIZE + PADDING, (clicks[0] if pov else 7 - clicks[0]) * SQUARE_SIZE + PADDING, SQUARE_SIZE, SQUARE_SIZE))
-                transparent_surface = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-                transparent_surface.fill((20, 20, 20, 170))
-                screen.blit(transparent_surface, ((clicks[1] if pov else 7 - clicks[1]) * SQUARE_SIZE + PADDING, (clicks[0] if pov else 7 - clicks[0]) * SQUARE_SIZE + PADDING))
-                # drawing the piece finally to be on the top
-                screen.blit(IMAGES[piece], pygame.Rect(pygame.mouse.get_pos()[0] - SQUARE_SIZE // 2, pygame.mouse.get_pos()[1] - SQUARE_SIZE // 2, PIECE_SIZE, PIECE_SIZE))
-                pygame.display.update(board_rect)
-
-            elif event.type == pygame.MOUSEWHEEL and not in_board():
+            elif event.type == pygame.MOUSEWHEEL and not in_board(mx, my):
                 # scrolling the moves
-                if BOARD_HEIGHT // 2 + PADDING <= pygame.mouse.get_pos()[1]:
+                if BOARD_HEIGHT // 2 + PADDING <= my:
                     scrolling_size = handle_scrolling(event, scrolling_size)
                     update_move_log(scrolling_size)
-                    pygame.display.flip()
+                    DIRTY_RECTS.append(pygame.Rect(BOARD_WIDTH + 2 * PADDING, BOARD_HEIGHT // 2 + PADDING, SIDE_PANEL_WIDTH, BOARD_HEIGHT // 2))
                 # changing engine depth
-                elif text_y <= pygame.mouse.get_pos()[1] <= text_y + depth_text_surface.get_height() and text_x <= pygame.mouse.get_pos()[0] <= text_x + depth_text_surface.get_width():
+                elif DEPTH_RECT.collidepoint(mx, my):
                     engine_depth += event.y
                     if engine_depth < 10:
                         engine_depth = 10
                     elif engine_depth >= 35:
                         engine_depth = 35
-                    start_update_engine_panel_thread(True)
+                    rebuild_ui_rects()   # the digits of the depth have different widths
+                    start_engine_analysis()
+
+            elif event.type == ENGINE_LINES_EVENT or event.type == ENGINE_DONE_EVENT:
+                handle_engine_event(event)
 
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_LEFT:   # undo move
                     board.undo_move()
                     update_display(None, scrolling_size, selected_piece)
-                    start_update_engine_panel_thread(re_analyze=True)
+                    start_engine_analysis()
                     
             elif event.type == pygame.VIDEORESIZE:
 
@@ -826,68 +1049,97 @@ def main() -> None:
                         raise pygame.error
 
                     pygame.display.set_mode((window_width, window_height), pygame.RESIZABLE)
-                    BOARD_WIDTH = BOARD_HEIGHT = window_height * (15/16)
+                    BOARD_WIDTH = BOARD_HEIGHT = window_height * 15 // 16
                     PADDING = BOARD_HEIGHT // 30
                     SIDE_PANEL_WIDTH = window_width - BOARD_WIDTH - PADDING * 3
                     SQUARE_SIZE = BOARD_HEIGHT // 8
-                    PIECE_SIZE = SQUARE_SIZE*0.9
+                    PIECE_SIZE = SQUARE_SIZE * 9 // 10
                     SQ_PIECE_DIFFERENCE = (SQUARE_SIZE - PIECE_SIZE) // 2 
                     
                     board_rect = pygame.Rect(0, 0, BOARD_WIDTH + PADDING, BOARD_HEIGHT + PADDING)
-                    side_panel_rect = pygame.Rect(BOARD_WIDTH + PADDING, 0, SIDE_PANEL_WIDTH + PADDING * 2, BOARD_HEIGHT + PADDING)
 
                     load_images()
+                    load_icons()
+                    rebuild_ui_rects()
+                    load_square_positions()
 
                 except pygame.error:   # if the user tries to resize to obscure sizes
-                    window_width, window_height = SCREEN_WIDTH * 0.8, SCREEN_HEIGHT * 0.8
+                    window_width, window_height = int(SCREEN_WIDTH * 0.8), int(SCREEN_HEIGHT * 0.8)
                     # resetting dimensions to default
                     pygame.display.set_mode((window_width, window_height), pygame.RESIZABLE)
-                    BOARD_WIDTH = BOARD_HEIGHT = window_height * (15/16)
+                    BOARD_WIDTH = BOARD_HEIGHT = window_height * 15 // 16
                     PADDING = BOARD_HEIGHT // 30
                     SIDE_PANEL_WIDTH = window_width - BOARD_WIDTH - PADDING * 3
                     SQUARE_SIZE = BOARD_HEIGHT // 8
-                    PIECE_SIZE = SQUARE_SIZE*0.9
+                    PIECE_SIZE = SQUARE_SIZE * 9 // 10
                     SQ_PIECE_DIFFERENCE = (SQUARE_SIZE - PIECE_SIZE) // 2 
                     
                     board_rect = pygame.Rect(0, 0, BOARD_WIDTH + PADDING, BOARD_HEIGHT + PADDING)
-                    side_panel_rect = pygame.Rect(BOARD_WIDTH + PADDING, 0, SIDE_PANEL_WIDTH + PADDING * 2, BOARD_HEIGHT + PADDING)
 
                     load_images()
+                    load_icons()
+                    rebuild_ui_rects()
+                    load_square_positions()
                     update_display(None, scrolling_size, selected_piece)
 
                     # error displaying
                     display_message(pygame.display.get_surface(), "Invalid window size! Resetting...", duration=2000)
                     
                 finally:
+                    drag_background = None   # the board is drawn at a new size
                     update_display(None, scrolling_size, selected_piece)
 
             elif event.type == pygame.ACTIVEEVENT and event.gain == 1:  # Window restored
                 # we need to update display to remove the black screen that appears after minimizing the window
                 update_display(None, scrolling_size, selected_piece)
 
-        # coordinates for drawing the text box if the mouse is over the word depth so we can change it by scrolling
-        font = pygame.font.Font(None, int(BOARD_HEIGHT * 1/20))
-        depth_text_surface = font.render(f"Depth: {engine_depth}", True, TEXT_COLOR)
-        icon_center_y = PADDING + engine_icon.get_height() // 2
-        text_y = icon_center_y - depth_text_surface.get_height() + PADDING * 1.5
-        text_x = BOARD_WIDTH + PADDING * 2 + engine_icon.get_width() + PADDING
-        
-        if not in_board():   # drawing text boxes over the buttons to show the user what they do
-            if window_width - PADDING * 5 <= pygame.mouse.get_pos()[0] <= window_width - PADDING * 2:
-                if BOARD_HEIGHT // 2 + PADDING <= pygame.mouse.get_pos()[1] <= BOARD_HEIGHT // 2 + PADDING * 5:
-                    draw_text_box("Copy FEN", (window_width - PADDING * 4, BOARD_HEIGHT // 2 + PADDING))
-                elif BOARD_HEIGHT // 2 + PADDING * 6 <= pygame.mouse.get_pos()[1] <= BOARD_HEIGHT // 2 + PADDING * 9:
-                    draw_text_box("Paste FEN", (window_width - PADDING * 4, BOARD_HEIGHT // 2 + PADDING * 5))
-                elif BOARD_HEIGHT // 2 + PADDING * 10 <= pygame.mouse.get_pos()[1] <= BOARD_HEIGHT // 2 + PADDING * 13:
-                    draw_text_box("Flip Perspective", (window_width - PADDING * 4, BOARD_HEIGHT // 2 + PADDING * 9))
-                elif BOARD_HEIGHT // 2 + PADDING * 14 <= pygame.mouse.get_pos()[1] <= BOARD_HEIGHT // 2 + PADDING * 17:
-                    draw_text_box("Toggle Theme", (window_width - PADDING * 4, BOARD_HEIGHT // 2 + PADDING * 13))
-                else:
-                    update_display(side_panel_rect, scrolling_size, selected_piece)
-            # elses needed to remove the box when the mouse is away from the buttons
-            elif text_y <= pygame.mouse.get_pos()[1] <= text_y + depth_text_surface.get_height() and text_x <= pygame.mouse.get_pos()[0] <= text_x + depth_text_surface.get_width():
-                draw_text_box('scroll to change depth', (text_x, text_y))
+        mx, my = pygame.mouse.get_pos()   # the mouse may have moved after the last event
+        # dragging animation, however many motions there were the piece is only drawn once per frame where the mouse is now
+        if drag_moved and dragging and in_board(mx, my):
+            piece = board.piece_at(clicks[0], clicks[1])   # taking the moved piece
+            if drag_background is None:
+                # the board with the highlights of the piece is already on the screen from the click so only the square
+                # the piece is lifted from is drawn again, empty and shaded
+                start_square_rect = pygame.Rect(SQUARE_POSITIONS[pov][clicks[0] * 8 + clicks[1]], (SQUARE_SIZE, SQUARE_SIZE))
+                pygame.draw.rect(screen, LIGHT_SQ if clicks[0] % 2 == clicks[1] % 2 else DARK_SQ, start_square_rect)
+                screen.blit(transparent_square(SQUARE_SIZE, (20, 20, 20, 170)), start_square_rect)
+                # the board doesn't change while dragging so it is kept and only the squares the piece covered are redrawn from it
+                drag_background = screen.subsurface(board_rect).copy()
+                DIRTY_RECTS.append(start_square_rect)
             else:
-                update_display(side_panel_rect, scrolling_size, selected_piece)
+                screen.blit(drag_background, dragged_piece_rect, dragged_piece_rect)
+                DIRTY_RECTS.append(dragged_piece_rect)
+            # drawing the piece finally to be on the top, it is kept inside the board so the copy of the board can always remove it
+            dragged_piece_rect = pygame.Rect(mx - SQUARE_SIZE // 2, my - SQUARE_SIZE // 2, PIECE_SIZE, PIECE_SIZE).clip(board_rect)
+            screen.set_clip(dragged_piece_rect)
+            screen.blit(IMAGES[piece], (mx - SQUARE_SIZE // 2, my - SQUARE_SIZE // 2))
+            screen.set_clip(None)
+            DIRTY_RECTS.append(dragged_piece_rect)
+        drag_moved = False
+
+        # anything but moving the mouse may have drawn over the side panel, this includes new engine lines
+        side_panel_changed = any(event.type != pygame.MOUSEMOTION for event in events)
+        
+        # drawing text boxes over the buttons to show the user what they do, the tooltip of a button is drawn just above it
+        tooltip = None
+        if not in_board(mx, my):
+            tooltip = next(((BUTTON_TOOLTIPS[icon], rect.topleft) for icon, rect in BUTTON_RECTS if rect.collidepoint(mx, my)), None)
+            if tooltip is None and DEPTH_RECT.collidepoint(mx, my):
+                tooltip = ('scroll to change depth', DEPTH_RECT.topleft)
+
+        # only the area of a tooltip that was shown is drawn again to remove it, this is also done when the mouse goes
+        # straight onto the board. A tooltip is drawn again when the mouse moves onto another one or something may
+        # have been drawn over it
+        if tooltip != shown_tooltip:
+            if shown_tooltip is not None:
+                erase_text_box(shown_tooltip_rect)
+            if tooltip is not None:
+                shown_tooltip_rect = draw_text_box(*tooltip)
+        elif tooltip is not None and side_panel_changed:
+            shown_tooltip_rect = draw_text_box(*tooltip)
+        shown_tooltip = tooltip
         
+        if DIRTY_RECTS:
+            pygame.display.update(DIRTY_RECTS)
+            DIRTY_RECTS.clear()
         clock.tick(MAX_FPS)
@@ -14,6 +14,10 @@ Key Features:
 
 from typing import Union
 
+# the letters of the files and the numbers of the ranks indexed by column and row, row 0 is the 8th rank
+FILE_MAP = ('a', 'b', 'c', 'd', 'e', 'f', 'g', 'h')
+RANK_MAP = ('8', '7', '6', '5', '4', '3', '2', '1')
+
 class Move:
     '''
     This will take coordinates in  the form python indexing coordinates as rows and columns and make a move which contains the follow info:
@@ -21,8 +25,9 @@ class Move:
         2. moved and captured piece(the extra details are necessary for undo purposes) + promotion(extra case)
         3. the move in uci notation
     '''
-    file_map = {0: 'a', 1: 'b', 2: 'c', 3: 'd', 4: 'e', 5: 'f', 6: 'g', 7: 'h'}
-    rank_map = {7: '1', 6: '2', 5: '3', 4: '4', 3: '5', 2: '6', 1: '7', 0: '8'}
+    # slots instead of a __dict__ per move as a move is made for every legal move of every position
+    __slots__ = ('board', 'start_row', 'start_col', 'end_row', 'end_col', 'start_square', 'end_square', 'piece_moved',
+                 'piece_captured', 'is_check', 'is_castling', 'promoted_piece', 'uci', '_san')
 
     def __init__(self, board, coordinates: Union[tuple, list], promoted_piece: str = None, is_castling: bool = False \
                  , is_check: bool = False) -> None:
@@ -40,19 +45,40 @@ class Move:
         # abstraction to make dealing with making move classes and other stuff easier
         self.board = board
 
-        self.start_row = coordinates[0]
-        self.start_col = coordinates[1]
-        self.end_row = coordinates[2]
-        self.end_col = coordinates[3]
-
-        self.piece_moved = board.board_array[self.start_row][self.start_col]
-        self.piece_captured = board.board_array[self.end_row][self.end_col]
+        # unpacked once as the coordinates can be the list of clicks from the gui
+        start_row, start_col, end_row, end_col = coordinates
+        self.start_row = start_row
+        self.start_col = start_col
+        self.end_row = end_row
+        self.end_col = end_col
+        self.start_square = start_row * 8 + start_col   # square indexes of the board (row * 8 + col)
+        self.end_square = end_row * 8 + end_col
+
+        self.piece_moved = board.piece_at(start_row, start_col)
+        self.piece_captured = board.piece_at(end_row, end_col)
         self.is_check = is_check
 
         self.is_castling = is_castling
         self.promoted_piece = promoted_piece
-        self.uci = self.coordinates_to_uci(coordinates)
-        self.san = self.get_san()
+        self.uci = self.coordinates_to_uci()
+        self._san = None   # see the san property
+
+    @property
+    def san(self) -> str:
+        '''
+        The move in san, it is only made the first time it is asked for as most moves are made while generating
+        the legal moves and are never shown. The board sets it again for a played move once it knows about checks
+
+        Returns:
+            str: The move in san
+        '''
+        if self._san is None:
+            self._san = self.get_san()
+        return self._san
+
+    @san.setter
+    def san(self, san: str) -> None:
+        self._san = san
 
     def __repr__(self) -> str:
             """
@@ -77,6 +103,15 @@ class Move:
         """
         return self.uci == other.uci
 
+    def __hash__(self) -> int:
+        """
+        Hashes the move by its UCI notation so that moves that are equal have the same hash.
+
+        Returns:
+            int: The hash of the UCI notation.
+        """
+        return hash(self.uci)
+
     def __str__(self) -> str:
         """
         Returns a string representation of the Move object.
@@ -86,23 +121,18 @@ class Move:
         """
         return self.san
 
-    def coordinates_to_uci(self, coordinates: Union[list, tuple]) -> str:
+    def coordinates_to_uci(self) -> str:
         '''
         This will make a uci sting(universal chess interface) for each move for convenient understanding and communication
 
-        Args:
-            coordinates (list or tuple): A list of index coordinates of starting and destination squares
-
         Returns:
             str: The uci string
         '''
         if self.promoted_piece is not None:   # promotion has different uci notation
-            uci = self.file_map[self.start_col] + self.file_map[self.end_col] + self.rank_map[self.end_row] + '=' + self.promoted_piece
-            return uci
+            return f"{FILE_MAP[self.start_col]}{FILE_MAP[self.end_col]}{RANK_MAP[self.end_row]}={self.promoted_piece}"
 
-        # the swapping of order is necessary here as the input is in y, x order so that we can deal with indexing more easily
-        uci = self.file_map[coordinates[1]] + self.rank_map[coordinates[0]] + self.file_map[coordinates[3]] + self.rank_map[coordinates[2]]
-        return uci
+        # the column comes first in uci while the coordinates are in row, column order so that we can deal with indexing more easily
+        return f"{FILE_MAP[self.start_col]}{RANK_MAP[self.start_row]}{FILE_MAP[self.end_col]}{RANK_MAP[self.end_row]}"
 
     def get_san(self) -> str:
         '''
@@ -114,15 +144,14 @@ class Move:
         if self.piece_moved[1] == 'p':   # pawn moves
             san = self.uci[2:] if self.promoted_piece is None else self.uci[1:]
             if self.piece_captured != '--' or self.start_col != self.end_col:   #  add x for captures including en passants
-                san = self.uci[0] + 'x' + san
+                san = f"{self.uci[0]}x{san}"
 
         elif self.is_castling:   # castling cases
             san = 'O-O' if self.start_col < self.end_col else 'O-O-O'
 
         else:   # all other piece moves
-            san = self.piece_moved[1] + self.uci[2:]
-            if self.piece_captured != '--':
-                san = san[0] + 'x' + san[1:]
+            capture = 'x' if self.piece_captured != '--' else ''
+            san = f"{self.piece_moved[1]}{capture}{self.uci[2:]}"
 
         if self.is_check:
             san += '+'